@@ -1,26 +1,238 @@
 import re
-from typing import List, Dict, Any
+import threading
+from itertools import islice
+from typing import List, Dict, Any, NamedTuple, Optional, Set, Tuple
+import numpy as np
 from app.config import settings
 from app.models import AuditFinding, SeverityEnum
 
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+_UNLIMITED_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'unlimited\s+liability',
+    r'liability.*without\s+limit',
+    r'no\s+limitation\s+on\s+liability'
+)]
+
+_LIABILITY_RE = re.compile(r'liability', re.IGNORECASE)
+
+_BROAD_INDEMNITY_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'indemnif(?:y|ication).*all\s+claims',
+    r'indemnif(?:y|ication).*any\s+and\s+all',
+    r'hold\s+harmless.*all\s+claims'
+)]
+
+_CONVENIENCE_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'terminat(?:e|ion).*for\s+convenience',
+    r'terminat(?:e|ion).*without\s+cause',
+    r'either\s+party\s+may\s+terminat(?:e|ion)'
+)]
+
+_UNLIMITED_LIABILITY, _LIABILITY_MENTION, _BROAD_INDEMNITY, _TERMINATION_CONVENIENCE = range(4)
+
+_RISK_PATTERNS = (
+    (_UNLIMITED_LIABILITY, _UNLIMITED_RES),
+    (_LIABILITY_MENTION, [_LIABILITY_RE]),
+    (_BROAD_INDEMNITY, _BROAD_INDEMNITY_RES),
+    (_TERMINATION_CONVENIENCE, _CONVENIENCE_RES),
+)
+
+
+_UNICODE_SPACE_CLASS = r'[\t-\r\x{1C}-\x{20}\x{85}\x{A0}\x{1680}\x{2000}-\x{200A}\x{2028}\x{2029}\x{202F}\x{205F}\x{3000}]'
+
+
+_RISK_EXPRESSIONS = [
+    (pattern_id, pattern.pattern.replace(r'\s', _UNICODE_SPACE_CLASS))
+    for pattern_id, patterns in _RISK_PATTERNS
+    for pattern in patterns
+]
+_RISK_EXPRESSION_IDS = [pattern_id for pattern_id, _ in _RISK_EXPRESSIONS]
+
+
+def _build_risk_database():
+    if hyperscan is None:
+        return None
+
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+    try:
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[pattern.encode("utf-8") for _, pattern in _RISK_EXPRESSIONS],
+            ids=list(range(len(_RISK_EXPRESSIONS))),
+            elements=len(_RISK_EXPRESSIONS),
+            flags=[flags] * len(_RISK_EXPRESSIONS)
+        )
+    except hyperscan.error as e:
+        print(f"Hyperscan risk database compilation failed: {e}. Using fallback.")
+        return None
+    return database
+
+
+def _build_risk_set():
+    if re2 is None:
+        return None
+
+    options = re2.Options()
+    options.case_sensitive = False
+    risk_set = re2.Set.SearchSet(options)
+    for _, pattern in _RISK_EXPRESSIONS:
+        risk_set.Add(pattern)
+    risk_set.Compile()
+    return risk_set
+
+
+_RISK_DATABASE = _build_risk_database()
+_RISK_SET = _build_risk_set() if _RISK_DATABASE is None else None
+_RISK_SCRATCH = threading.local()
+
+
+def _scan_with_hyperscan(full_text: str) -> Set[int]:
+    scratch = getattr(_RISK_SCRATCH, "scratch", None)
+    if scratch is None:
+        scratch = _RISK_SCRATCH.scratch = hyperscan.Scratch(_RISK_DATABASE)
+
+    matched = set()
+
+    def on_match(index, start, end, flags, context):
+        matched.add(_RISK_EXPRESSION_IDS[index])
+
+    _RISK_DATABASE.scan(full_text.encode("utf-8", "replace"), match_event_handler=on_match, scratch=scratch)
+    return matched
+
+
+def _scan_risk_patterns(full_text: str) -> Set[int]:
+    if _RISK_DATABASE is not None:
+        return _scan_with_hyperscan(full_text)
+
+    if _RISK_SET is not None:
+        return {_RISK_EXPRESSION_IDS[index] for index in _RISK_SET.Match(full_text) or []}
+
+    return {
+        pattern_id for pattern_id, patterns in _RISK_PATTERNS
+        if any(pattern.search(full_text) for pattern in patterns)
+    }
+
+
+_RENEWAL_KEYWORDS = ("auto-renew", "automatic renewal")
+_UNLIMITED_KEYWORDS = ("unlimited liability", "without limit")
+_LIABILITY_KEYWORDS = ("liability",)
+_INDEMNITY_KEYWORDS = ("indemnif", "hold harmless")
+_TERMINATION_KEYWORDS = ("terminat",)
+_LIABILITY_CAP_KEYWORDS = ("liability", "limit")
+
+_EVIDENCE_KEYWORD_SETS = (
+    _RENEWAL_KEYWORDS, _UNLIMITED_KEYWORDS, _LIABILITY_KEYWORDS,
+    _INDEMNITY_KEYWORDS, _TERMINATION_KEYWORDS, _LIABILITY_CAP_KEYWORDS
+)
+
+
+EVIDENCE_CONTEXT_CHARS = 100
+FAST_SCAN_MIN_CHARS = 50_000
+
+
+def _compile_evidence_pattern(keyword: str) -> re.Pattern:
+    return re.compile(f'.{{0,{EVIDENCE_CONTEXT_CHARS}}}{re.escape(keyword)}.{{0,{EVIDENCE_CONTEXT_CHARS}}}', re.IGNORECASE)
+
+
+def _scan_keyword_spans(text_lower, keyword, max_matches, context):
+    spans = np.empty((max_matches, 2), dtype=np.int64)
+    count = 0
+    pos = 0
+    text_len = len(text_lower)
+    keyword_len = len(keyword)
+
+    while count < max_matches:
+        hit = text_lower.find(keyword, pos)
+        if hit == -1:
+            break
+
+        line_start = text_lower.rfind('\n', pos, hit) + 1
+        start = max(pos, hit - context, line_start)
+
+        line_end = text_lower.find('\n', hit)
+        if line_end == -1:
+            line_end = text_len
+
+        last_hit = text_lower.rfind(keyword, start, min(start + context + keyword_len, line_end))
+        end = min(last_hit + keyword_len + context, line_end)
+
+        spans[count, 0] = start
+        spans[count, 1] = end
+        count += 1
+        pos = end
+
+    return spans[:count]
+
+
+_scan_keyword = numba.njit(cache=True)(_scan_keyword_spans) if numba is not None else None
+
+
+def _fast_scan_text(full_text: str) -> Optional[str]:
+    if _scan_keyword is None or len(full_text) < FAST_SCAN_MIN_CHARS:
+        return None
+
+    full_text_lower = full_text.lower()
+    if len(full_text_lower) != len(full_text):
+        return None
+    return full_text_lower
+
+
+class PageIndex(NamedTuple):
+    starts: np.ndarray
+    ends: np.ndarray
+    numbers: np.ndarray
+
+
+def _build_page_index(pages_data: List[Dict]) -> PageIndex:
+    count = len(pages_data)
+    return PageIndex(
+        starts=np.fromiter((page["char_start"] for page in pages_data), dtype=np.int64, count=count),
+        ends=np.fromiter((page["char_end"] for page in pages_data), dtype=np.int64, count=count),
+        numbers=np.fromiter((page["page_number"] for page in pages_data), dtype=np.int64, count=count)
+    )
+
 
 class ContractAuditor:
     def __init__(self):
         self.liability_threshold = settings.liability_cap_threshold
         self.renewal_notice_threshold = settings.auto_renewal_notice_days
+        self._evidence_res: Dict[Tuple[str, ...], List[re.Pattern]] = {
+            keywords: [_compile_evidence_pattern(keyword) for keyword in keywords]
+            for keywords in _EVIDENCE_KEYWORD_SETS
+        }
 
     def audit_contract(self, document_id: str, full_text: str, extraction_data: Dict[str, Any], pages_data: List[Dict]) -> List[AuditFinding]:
         findings = []
+        matched = _scan_risk_patterns(full_text)
+        page_index = _build_page_index(pages_data)
+        full_text_lower = _fast_scan_text(full_text)
 
-        findings.extend(self._check_auto_renewal(document_id, full_text, extraction_data, pages_data))
-        findings.extend(self._check_unlimited_liability(document_id, full_text, extraction_data, pages_data))
-        findings.extend(self._check_broad_indemnity(document_id, full_text, extraction_data, pages_data))
-        findings.extend(self._check_termination_convenience(document_id, full_text, pages_data))
-        findings.extend(self._check_liability_cap(document_id, full_text, extraction_data, pages_data))
+        findings.extend(self._check_auto_renewal(document_id, full_text, full_text_lower, extraction_data, page_index))
+        findings.extend(self._check_unlimited_liability(document_id, full_text, full_text_lower, extraction_data, page_index, matched))
+        findings.extend(self._check_broad_indemnity(document_id, full_text, full_text_lower, extraction_data, page_index, matched))
+        findings.extend(self._check_termination_convenience(document_id, full_text, full_text_lower, page_index, matched))
+        findings.extend(self._check_liability_cap(document_id, full_text, full_text_lower, extraction_data, page_index))
+
+        for number, finding in enumerate(findings, 1):
+            finding.id = f"FIND-{number:03d}"
 
         return findings
 
-    def _check_auto_renewal(self, document_id: str, full_text: str, extraction_data: Dict, pages_data: List[Dict]) -> List[AuditFinding]:
+    def _check_auto_renewal(self, document_id: str, full_text: str, full_text_lower: Optional[str], extraction_data: Dict, page_index: PageIndex) -> List[AuditFinding]:
         findings = []
 
         auto_renewal = extraction_data.get("auto_renewal", {})
@@ -28,20 +240,20 @@ class ContractAuditor:
             notice_days = auto_renewal.get("notice_period_days")
 
             if notice_days and notice_days < self.renewal_notice_threshold:
-                evidence = self._find_evidence(full_text, pages_data, ["auto-renew", "automatic renewal"])
+                evidence = self._find_evidence(full_text, full_text_lower, page_index, _RENEWAL_KEYWORDS)
 
                 findings.append(AuditFinding(
-                    id=f"FIND-{len(findings)+1:03d}",
+                    id="",
                     severity=SeverityEnum.HIGH,
                     type="auto_renewal",
                     summary=f"Auto-renewal with {notice_days} days notice (less than {self.renewal_notice_threshold} days)",
                     evidence=evidence
                 ))
             elif not notice_days:
-                evidence = self._find_evidence(full_text, pages_data, ["auto-renew", "automatic renewal"])
+                evidence = self._find_evidence(full_text, full_text_lower, page_index, _RENEWAL_KEYWORDS)
 
                 findings.append(AuditFinding(
-                    id=f"FIND-{len(findings)+1:03d}",
+                    id="",
                     severity=SeverityEnum.HIGH,
                     type="auto_renewal",
                     summary="Auto-renewal clause with unclear notice period",
@@ -50,36 +262,28 @@ class ContractAuditor:
 
         return findings
 
-    def _check_unlimited_liability(self, document_id: str, full_text: str, extraction_data: Dict, pages_data: List[Dict]) -> List[AuditFinding]:
+    def _check_unlimited_liability(self, document_id: str, full_text: str, full_text_lower: Optional[str], extraction_data: Dict, page_index: PageIndex, matched: Set[int]) -> List[AuditFinding]:
         findings = []
 
         liability_cap = extraction_data.get("liability_cap")
 
-        unlimited_patterns = [
-            r'unlimited\s+liability',
-            r'liability.*without\s+limit',
-            r'no\s+limitation\s+on\s+liability'
-        ]
-
-        for pattern in unlimited_patterns:
-            if re.search(pattern, full_text, re.IGNORECASE):
-                evidence = self._find_evidence(full_text, pages_data, ["unlimited liability", "without limit"])
+        if _UNLIMITED_LIABILITY in matched:
+            evidence = self._find_evidence(full_text, full_text_lower, page_index, _UNLIMITED_KEYWORDS)
 
-                findings.append(AuditFinding(
-                    id=f"FIND-{len(findings)+1:03d}",
-                    severity=SeverityEnum.HIGH,
-                    type="unlimited_liability",
-                    summary="Contract contains unlimited liability clause",
-                    evidence=evidence
-                ))
-                break
+            findings.append(AuditFinding(
+                id="",
+                severity=SeverityEnum.HIGH,
+                type="unlimited_liability",
+                summary="Contract contains unlimited liability clause",
+                evidence=evidence
+            ))
 
         if not liability_cap and not findings:
-            if re.search(r'liability', full_text, re.IGNORECASE):
-                evidence = self._find_evidence(full_text, pages_data, ["liability"])[:1]
+            if _LIABILITY_MENTION in matched:
+                evidence = self._find_evidence(full_text, full_text_lower, page_index, _LIABILITY_KEYWORDS)[:1]
 
                 findings.append(AuditFinding(
-                    id=f"FIND-{len(findings)+1:03d}",
+                    id="",
                     severity=SeverityEnum.HIGH,
                     type="unlimited_liability",
                     summary="No liability cap specified in contract",
@@ -88,48 +292,31 @@ class ContractAuditor:
 
         return findings
 
-    def _check_broad_indemnity(self, document_id: str, full_text: str, extraction_data: Dict, pages_data: List[Dict]) -> List[AuditFinding]:
+    def _check_broad_indemnity(self, document_id: str, full_text: str, full_text_lower: Optional[str], extraction_data: Dict, page_index: PageIndex, matched: Set[int]) -> List[AuditFinding]:
         findings = []
 
         indemnity = extraction_data.get("indemnity", {})
-        if isinstance(indemnity, dict) and indemnity.get("exists"):
-            broad_patterns = [
-                r'indemnif(?:y|ication).*all\s+claims',
-                r'indemnif(?:y|ication).*any\s+and\s+all',
-                r'hold\s+harmless.*all\s+claims'
-            ]
-
-            for pattern in broad_patterns:
-                if re.search(pattern, full_text, re.IGNORECASE):
-                    evidence = self._find_evidence(full_text, pages_data, ["indemnif", "hold harmless"])
-
-                    findings.append(AuditFinding(
-                        id=f"FIND-{len(findings)+1:03d}",
-                        severity=SeverityEnum.MEDIUM,
-                        type="broad_indemnity",
-                        summary="Indemnity clause covers broad scope (all claims)",
-                        evidence=evidence
-                    ))
-                    break
+        if isinstance(indemnity, dict) and indemnity.get("exists") and _BROAD_INDEMNITY in matched:
+            evidence = self._find_evidence(full_text, full_text_lower, page_index, _INDEMNITY_KEYWORDS)
+
+            findings.append(AuditFinding(
+                id="",
+                severity=SeverityEnum.MEDIUM,
+                type="broad_indemnity",
+                summary="Indemnity clause covers broad scope (all claims)",
+                evidence=evidence
+            ))
 
         return findings
 
-    def _check_termination_convenience(self, document_id: str, full_text: str, pages_data: List[Dict]) -> List[AuditFinding]:
+    def _check_termination_convenience(self, document_id: str, full_text: str, full_text_lower: Optional[str], page_index: PageIndex, matched: Set[int]) -> List[AuditFinding]:
         findings = []
 
-        convenience_patterns = [
-            r'terminat(?:e|ion).*for\s+convenience',
-            r'terminat(?:e|ion).*without\s+cause',
-            r'either\s+party\s+may\s+terminat(?:e|ion)'
-        ]
-
-        has_convenience = any(re.search(pattern, full_text, re.IGNORECASE) for pattern in convenience_patterns)
-
-        if not has_convenience:
-            evidence = self._find_evidence(full_text, pages_data, ["terminat"])[:1]
+        if _TERMINATION_CONVENIENCE not in matched:
+            evidence = self._find_evidence(full_text, full_text_lower, page_index, _TERMINATION_KEYWORDS)[:1]
 
             findings.append(AuditFinding(
-                id=f"FIND-{len(findings)+1:03d}",
+                id="",
                 severity=SeverityEnum.MEDIUM,
                 type="missing_termination_convenience",
                 summary="Contract lacks termination for convenience clause",
@@ -138,7 +325,7 @@ class ContractAuditor:
 
         return findings
 
-    def _check_liability_cap(self, document_id: str, full_text: str, extraction_data: Dict, pages_data: List[Dict]) -> List[AuditFinding]:
+    def _check_liability_cap(self, document_id: str, full_text: str, full_text_lower: Optional[str], extraction_data: Dict, page_index: PageIndex) -> List[AuditFinding]:
         findings = []
 
         liability_cap = extraction_data.get("liability_cap")
@@ -146,10 +333,10 @@ class ContractAuditor:
         if liability_cap and isinstance(liability_cap, dict):
             amount = liability_cap.get("amount")
             if amount and amount < self.liability_threshold:
-                evidence = self._find_evidence(full_text, pages_data, ["liability", "limit"])
+                evidence = self._find_evidence(full_text, full_text_lower, page_index, _LIABILITY_CAP_KEYWORDS)
 
                 findings.append(AuditFinding(
-                    id=f"FIND-{len(findings)+1:03d}",
+                    id="",
                     severity=SeverityEnum.LOW,
                     type="low_liability_cap",
                     summary=f"Liability cap ${amount:,.0f} is below recommended threshold ${self.liability_threshold:,.0f}",
@@ -158,28 +345,31 @@ class ContractAuditor:
 
         return findings
 
-    def _find_evidence(self, full_text: str, pages_data: List[Dict], keywords: List[str]) -> List[Dict[str, Any]]:
+    def _find_evidence(self, full_text: str, full_text_lower: Optional[str], page_index: PageIndex, keywords: Tuple[str, ...]) -> List[Dict[str, Any]]:
         evidence = []
 
-        for keyword in keywords:
-            pattern = re.compile(f'.{{0,100}}{re.escape(keyword)}.{{0,100}}', re.IGNORECASE)
-            matches = list(pattern.finditer(full_text))
+        patterns = self._evidence_res.get(keywords)
+        if patterns is None:
+            patterns = [_compile_evidence_pattern(keyword) for keyword in keywords]
+            self._evidence_res[keywords] = patterns
 
-            for match in matches[:2]:
-                char_start = match.start()
-                char_end = match.end()
+        for keyword, pattern in zip(keywords, patterns):
+            if full_text_lower is not None:
+                spans = _scan_keyword(full_text_lower, keyword.lower(), 2, EVIDENCE_CONTEXT_CHARS).tolist()
+            else:
+                spans = [match.span() for match in islice(pattern.finditer(full_text), 2)]
 
+            for char_start, char_end in spans:
                 page_num = 1
-                for page_data in pages_data:
-                    if page_data["char_start"] <= char_start < page_data["char_end"]:
-                        page_num = page_data["page_number"]
-                        break
+                idx = int(np.searchsorted(page_index.starts, char_start, side="right")) - 1
+                if idx >= 0 and char_start < page_index.ends[idx]:
+                    page_num = int(page_index.numbers[idx])
 
                 evidence.append({
                     "page": page_num,
                     "char_start": char_start,
                     "char_end": char_end,
-                    "excerpt": match.group(0)
+                    "excerpt": full_text[char_start:char_end]
                 })
 
             if evidence:
@@ -8,6 +8,9 @@ class Settings(BaseSettings):
     openai_api_key: Optional[str] = None
     liability_cap_threshold: int = 50000
     auto_renewal_notice_days: int = 30
+    embedding_dim: int = 384
+    pdf_cache_dir: Optional[str] = None
+    pdf_cache_max_entries: int = 256
 
     class Config:
         env_file = ".env"
@@ -1,21 +1,38 @@
+from functools import lru_cache
+from typing import List
 from supabase import create_client, Client
 from app.config import settings
 
+INSERT_BATCH_SIZE = 500
 
+
+@lru_cache(maxsize=1)
 def get_supabase_client() -> Client:
     return create_client(settings.supabase_url, settings.supabase_anon_key)
 
 
-async def increment_metric(metric_name: str):
+def bulk_insert(table: str, records: List[dict], batch_size: int = INSERT_BATCH_SIZE):
     supabase = get_supabase_client()
+    for start in range(0, len(records), batch_size):
+        supabase.table(table).insert(records[start:start + batch_size]).execute()
+
+
+def bulk_insert_pages(pages: List[dict], batch_size: int = INSERT_BATCH_SIZE):
+    bulk_insert("document_pages", pages, batch_size)
+
 
-    result = supabase.table("metrics").select("metric_value").eq("metric_name", metric_name).maybeSingle().execute()
+def bulk_insert_chunks(chunks: List[dict], batch_size: int = INSERT_BATCH_SIZE):
+    bulk_insert("document_chunks", chunks, batch_size)
 
-    if result.data:
-        current_value = result.data["metric_value"]
-        supabase.table("metrics").update({"metric_value": current_value + 1}).eq("metric_name", metric_name).execute()
-    else:
-        supabase.table("metrics").insert({"metric_name": metric_name, "metric_value": 1}).execute()
+
+def delete_documents(document_ids: List[str]):
+    if document_ids:
+        get_supabase_client().table("documents").delete().in_("id", document_ids).execute()
+
+
+async def increment_metric(metric_name: str, delta: int = 1):
+    supabase = get_supabase_client()
+    supabase.rpc("increment_metric", {"name": metric_name, "delta": delta}).execute()
 
 
 async def get_metrics():
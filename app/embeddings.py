@@ -1,26 +1,53 @@
-from typing import List, Optional
+import threading
+from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 from app.config import settings
 
+OPENAI_BATCH_SIZE = 96
+OPENAI_MAX_CONNECTIONS = 16
+
+
+def _half_precision(embeddings) -> list:
+    return np.asarray(embeddings, dtype=np.float16).tolist()
+
 
 class EmbeddingService:
     def __init__(self):
         self.use_openai = bool(settings.openai_api_key)
         self.model = None
+        self._model_lock = threading.Lock()
 
         if self.use_openai:
             try:
+                import httpx
                 import openai
-                self.openai_client = openai.OpenAI(api_key=settings.openai_api_key)
+                self.openai_client = openai.OpenAI(
+                    api_key=settings.openai_api_key,
+                    http_client=httpx.Client(limits=httpx.Limits(
+                        max_connections=OPENAI_MAX_CONNECTIONS,
+                        max_keepalive_connections=OPENAI_MAX_CONNECTIONS
+                    ))
+                )
+                self._openai_pool = ThreadPoolExecutor(max_workers=OPENAI_MAX_CONNECTIONS)
             except Exception as e:
                 print(f"Failed to initialize OpenAI: {e}. Falling back to sentence-transformers.")
                 self.use_openai = False
 
         if not self.use_openai:
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            self._get_model()
+
+    def _get_model(self):
+        with self._model_lock:
+            if self.model is None:
+                from sentence_transformers import SentenceTransformer
+                self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            return self.model
 
     def embed_text(self, text: str) -> List[float]:
+        return self.embed_text_with_fallback(text)[0]
+
+    def embed_text_with_fallback(self, text: str) -> Tuple[List[float], bool]:
         if self.use_openai:
             try:
                 response = self.openai_client.embeddings.create(
@@ -28,33 +55,59 @@ class EmbeddingService:
                     input=text,
                     dimensions=384
                 )
-                return response.data[0].embedding
+                return _half_precision(response.data[0].embedding), False
             except Exception as e:
                 print(f"OpenAI embedding failed: {e}. Using fallback.")
-                if not self.model:
-                    from sentence_transformers import SentenceTransformer
-                    self.model = SentenceTransformer('all-MiniLM-L6-v2')
 
-        embedding = self.model.encode(text, convert_to_numpy=True)
-        return embedding.tolist()
+        embedding = self._get_model().encode(
+            text,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return _half_precision(embedding), self.use_openai
+
+    def _embed_openai_batch(self, texts: List[str]) -> List[List[float]]:
+        response = self.openai_client.embeddings.create(
+            model="text-embedding-3-small",
+            input=texts,
+            dimensions=384
+        )
+        return _half_precision([item.embedding for item in response.data])
+
+    def _embed_openai_shard(self, texts: List[str]) -> List[List[float]]:
+        try:
+            return self._embed_openai_batch(texts)
+        except Exception as e:
+            print(f"OpenAI embedding shard of {len(texts)} texts failed: {e}. Retrying.")
+            return self._embed_openai_batch(texts)
 
     def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_batch_with_fallback(texts)[0]
+
+    def embed_batch_with_fallback(self, texts: List[str]) -> Tuple[List[List[float]], bool]:
+        if not texts:
+            return [], False
+
         if self.use_openai:
             try:
-                response = self.openai_client.embeddings.create(
-                    model="text-embedding-3-small",
-                    input=texts,
-                    dimensions=384
-                )
-                return [item.embedding for item in response.data]
+                batches = [texts[i:i + OPENAI_BATCH_SIZE] for i in range(0, len(texts), OPENAI_BATCH_SIZE)]
+                if len(batches) == 1:
+                    return self._embed_openai_shard(texts), False
+
+                results = self._openai_pool.map(self._embed_openai_shard, batches)
+                return [embedding for batch in results for embedding in batch], False
             except Exception as e:
                 print(f"OpenAI batch embedding failed: {e}. Using fallback.")
-                if not self.model:
-                    from sentence_transformers import SentenceTransformer
-                    self.model = SentenceTransformer('all-MiniLM-L6-v2')
 
-        embeddings = self.model.encode(texts, convert_to_numpy=True)
-        return embeddings.tolist()
+        embeddings = self._get_model().encode(
+            texts,
+            batch_size=64,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return _half_precision(embeddings), self.use_openai
 
 
 embedding_service = EmbeddingService()
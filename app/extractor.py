@@ -1,13 +1,89 @@
 import re
-from typing import Dict, Any, List, Optional
+import json
+import hashlib
+from collections import OrderedDict
+from itertools import islice
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 from app.config import settings
 from app.models import ExtractResponse, AutoRenewal, Confidentiality, Indemnity, LiabilityCap, Signatory
 
 
+_PARTY_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'between\s+([A-Z][A-Za-z\s&.,]+?)\s+(?:and|,)',
+    r'by and between\s+([A-Z][A-Za-z\s&.,]+?)(?:\s+and|\s*,)',
+    r'Party\s+[A-Z]:\s*([A-Z][A-Za-z\s&.,]+)',
+    r'"([A-Z][A-Za-z\s&.,]+?)"\s*\((?:hereinafter|the)\s+"(?:Company|Client|Vendor)',
+)]
+
+_DATE_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'effective\s+(?:date|as\s+of)[:\s]+([A-Za-z]+\s+\d{1,2},?\s+\d{4})',
+    r'dated\s+(?:as\s+of\s+)?([A-Za-z]+\s+\d{1,2},?\s+\d{4})',
+    r'(\d{1,2}/\d{1,2}/\d{4})',
+    r'(\d{4}-\d{2}-\d{2})',
+)]
+
+_TERM_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'term[:\s]+([0-9]+\s+(?:year|month|day)s?)',
+    r'duration[:\s]+([0-9]+\s+(?:year|month|day)s?)',
+    r'period of\s+([0-9]+\s+(?:year|month|day)s?)',
+)]
+
+_LAW_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'governed by the laws of\s+([A-Za-z\s,]+?)(?:\.|,|\n)',
+    r'governing law[:\s]+([A-Za-z\s,]+?)(?:\.|,|\n)',
+    r'jurisdiction[:\s]+([A-Za-z\s,]+?)(?:\.|,|\n)',
+)]
+
+_PAYMENT_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'payment terms?[:\s]+([^\n.]{10,100})',
+    r'net\s+\d+\s+days?',
+    r'\$[\d,]+(?:\.\d{2})?\s+(?:per|monthly|annually)',
+)]
+
+_TERMINATION_RE = re.compile(r'termination[:\s]+([^\n]{20,200})', re.IGNORECASE)
+_NOTICE_RE = re.compile(r'(\d+)\s+days?\s+(?:prior\s+)?notice', re.IGNORECASE)
+_CONFIDENTIALITY_RE = re.compile(r'confidential(?:ity)?[:\s]+([^\n]{20,150})', re.IGNORECASE)
+_INDEMNITY_RE = re.compile(r'indemni(?:ty|fication|fy)[:\s]+([^\n]{20,150})', re.IGNORECASE)
+
+_LIABILITY_CAP_RES = [re.compile(p, re.IGNORECASE) for p in (
+    r'liability.*?(?:limited|capped|not exceed)\s+.*?\$?([\d,]+)',
+    r'\$?([\d,]+).*?(?:maximum|limit).*?liability',
+)]
+
+_AUTO_RENEWAL_KEYWORDS = ('auto-renew', 'automatic renewal', 'automatically renew')
+_CONFIDENTIALITY_KEYWORDS = ('confidential', 'confidentiality', 'non-disclosure')
+_INDEMNITY_KEYWORDS = ('indemnif', 'hold harmless')
+
+CLAUSE_WINDOW_BEFORE = 200
+CLAUSE_WINDOW_AFTER = 500
+
+_LLM_FIELDS = {
+    "parties": "Parties (list of company names)",
+    "effective_date": "Effective date (YYYY-MM-DD format)",
+    "term": 'Term (e.g., "12 months")',
+    "governing_law": "Governing law (state/country)",
+    "payment_terms": "Payment terms (brief description)",
+}
+
+_LLM_CACHE_SIZE = 256
+
+_SIG_RE = re.compile(r'(?:By:|Signature:)\s*([A-Z][a-z]+\s+[A-Z][a-z]+)\s*(?:Title:)?\s*([A-Z][a-z\s]+)?')
+
+
+def _clause_window(text: str, text_lower: str, keywords: Tuple[str, ...]) -> Optional[str]:
+    hits = [pos for pos in (text_lower.find(keyword) for keyword in keywords) if pos != -1]
+    if not hits:
+        return None
+
+    pos = min(hits)
+    return text[max(0, pos - CLAUSE_WINDOW_BEFORE):pos + CLAUSE_WINDOW_AFTER]
+
+
 class FieldExtractor:
     def __init__(self):
         self.use_openai = bool(settings.openai_api_key)
+        self._llm_cache: "OrderedDict[Tuple[str, Tuple[str, ...]], Dict[str, Any]]" = OrderedDict()
         if self.use_openai:
             try:
                 import openai
@@ -17,170 +93,135 @@ class FieldExtractor:
 
     def extract_fields(self, document_id: str, full_text: str, pages_data: List[Dict]) -> ExtractResponse:
         result = ExtractResponse(document_id=document_id)
+        full_text_lower = full_text.lower()
+        head = full_text[:3000]
 
-        result.parties = self._extract_parties(full_text)
-        result.effective_date = self._extract_effective_date(full_text)
+        result.parties = self._extract_parties(head)
+        result.effective_date = self._extract_effective_date(head)
         result.term = self._extract_term(full_text)
         result.governing_law = self._extract_governing_law(full_text)
         result.payment_terms = self._extract_payment_terms(full_text)
         result.termination = self._extract_termination(full_text)
-        result.auto_renewal = self._extract_auto_renewal(full_text)
-        result.confidentiality = self._extract_confidentiality(full_text)
-        result.indemnity = self._extract_indemnity(full_text)
+        result.auto_renewal = self._extract_auto_renewal(full_text, full_text_lower)
+        result.confidentiality = self._extract_confidentiality(full_text, full_text_lower)
+        result.indemnity = self._extract_indemnity(full_text, full_text_lower)
         result.liability_cap = self._extract_liability_cap(full_text)
         result.signatories = self._extract_signatories(full_text)
 
         if self.use_openai:
-            result = self._enhance_with_llm(result, full_text)
+            result = self._enhance_with_llm(result, head)
 
         return result
 
-    def _extract_parties(self, text: str) -> List[str]:
+    def _extract_parties(self, head: str) -> List[str]:
         parties = []
 
-        party_patterns = [
-            r'between\s+([A-Z][A-Za-z\s&.,]+?)\s+(?:and|,)',
-            r'by and between\s+([A-Z][A-Za-z\s&.,]+?)(?:\s+and|\s*,)',
-            r'Party\s+[A-Z]:\s*([A-Z][A-Za-z\s&.,]+)',
-            r'"([A-Z][A-Za-z\s&.,]+?)"\s*\((?:hereinafter|the)\s+"(?:Company|Client|Vendor)',
-        ]
-
-        for pattern in party_patterns:
-            matches = re.finditer(pattern, text[:2000], re.IGNORECASE)
-            for match in matches:
+        for pattern in _PARTY_RES:
+            for match in pattern.finditer(head, 0, 2000):
                 party = match.group(1).strip()
                 if len(party) > 3 and party not in parties:
                     parties.append(party)
 
         return parties[:10]
 
-    def _extract_effective_date(self, text: str) -> Optional[str]:
-        date_patterns = [
-            r'effective\s+(?:date|as\s+of)[:\s]+([A-Za-z]+\s+\d{1,2},?\s+\d{4})',
-            r'dated\s+(?:as\s+of\s+)?([A-Za-z]+\s+\d{1,2},?\s+\d{4})',
-            r'(\d{1,2}/\d{1,2}/\d{4})',
-            r'(\d{4}-\d{2}-\d{2})',
-        ]
-
-        for pattern in date_patterns:
-            match = re.search(pattern, text[:3000], re.IGNORECASE)
+    def _extract_effective_date(self, head: str) -> Optional[str]:
+        for pattern in _DATE_RES:
+            match = pattern.search(head)
             if match:
-                date_str = match.group(1)
-                try:
-                    parsed = self._parse_date(date_str)
-                    if parsed:
-                        return parsed
-                except:
-                    pass
+                parsed = self._parse_date(match.group(1))
+                if parsed:
+                    return parsed
 
         return None
 
     def _parse_date(self, date_str: str) -> Optional[str]:
-        formats = [
-            "%B %d, %Y", "%B %d %Y", "%m/%d/%Y", "%Y-%m-%d",
-            "%d %B %Y", "%d-%m-%Y"
-        ]
-        for fmt in formats:
-            try:
-                dt = datetime.strptime(date_str, fmt)
-                return dt.strftime("%Y-%m-%d")
-            except:
-                continue
-        return None
+        date_str = date_str.strip()
+        if not date_str:
+            return None
+
+        if '/' in date_str:
+            fmt = "%m/%d/%Y"
+        elif '-' in date_str:
+            fmt = "%Y-%m-%d" if date_str[:4].isdigit() else "%d-%m-%Y"
+        elif date_str[0].isalpha():
+            fmt = "%B %d, %Y" if ',' in date_str else "%B %d %Y"
+        else:
+            fmt = "%d %B %Y"
+
+        try:
+            return datetime.strptime(date_str, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            return None
 
     def _extract_term(self, text: str) -> Optional[str]:
-        term_patterns = [
-            r'term[:\s]+([0-9]+\s+(?:year|month|day)s?)',
-            r'duration[:\s]+([0-9]+\s+(?:year|month|day)s?)',
-            r'period of\s+([0-9]+\s+(?:year|month|day)s?)',
-        ]
-
-        for pattern in term_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _TERM_RES:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
 
         return None
 
     def _extract_governing_law(self, text: str) -> Optional[str]:
-        law_patterns = [
-            r'governed by the laws of\s+([A-Za-z\s,]+?)(?:\.|,|\n)',
-            r'governing law[:\s]+([A-Za-z\s,]+?)(?:\.|,|\n)',
-            r'jurisdiction[:\s]+([A-Za-z\s,]+?)(?:\.|,|\n)',
-        ]
-
-        for pattern in law_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _LAW_RES:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
 
         return None
 
     def _extract_payment_terms(self, text: str) -> Optional[str]:
-        payment_patterns = [
-            r'payment terms?[:\s]+([^\n.]{10,100})',
-            r'net\s+\d+\s+days?',
-            r'\$[\d,]+(?:\.\d{2})?\s+(?:per|monthly|annually)',
-        ]
-
-        for pattern in payment_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _PAYMENT_RES:
+            match = pattern.search(text)
             if match:
                 return match.group(0).strip()
 
         return None
 
     def _extract_termination(self, text: str) -> Optional[str]:
-        term_match = re.search(r'termination[:\s]+([^\n]{20,200})', text, re.IGNORECASE)
+        term_match = _TERMINATION_RE.search(text)
         if term_match:
             return term_match.group(1).strip()
         return None
 
-    def _extract_auto_renewal(self, text: str) -> AutoRenewal:
-        auto_renewal_keywords = ['auto-renew', 'automatic renewal', 'automatically renew']
-        exists = any(keyword in text.lower() for keyword in auto_renewal_keywords)
+    def _extract_auto_renewal(self, text: str, text_lower: str) -> AutoRenewal:
+        window = _clause_window(text, text_lower, _AUTO_RENEWAL_KEYWORDS)
+        exists = window is not None
 
         notice_days = None
         if exists:
-            notice_pattern = r'(\d+)\s+days?\s+(?:prior\s+)?notice'
-            match = re.search(notice_pattern, text, re.IGNORECASE)
+            match = _NOTICE_RE.search(window)
             if match:
                 notice_days = int(match.group(1))
 
         return AutoRenewal(exists=exists, notice_period_days=notice_days)
 
-    def _extract_confidentiality(self, text: str) -> Confidentiality:
-        conf_keywords = ['confidential', 'confidentiality', 'non-disclosure']
-        exists = any(keyword in text.lower() for keyword in conf_keywords)
+    def _extract_confidentiality(self, text: str, text_lower: str) -> Confidentiality:
+        window = _clause_window(text, text_lower, _CONFIDENTIALITY_KEYWORDS)
+        exists = window is not None
 
         summary = None
         if exists:
-            match = re.search(r'confidential(?:ity)?[:\s]+([^\n]{20,150})', text, re.IGNORECASE)
+            match = _CONFIDENTIALITY_RE.search(window)
             if match:
                 summary = match.group(1).strip()
 
         return Confidentiality(exists=exists, summary=summary)
 
-    def _extract_indemnity(self, text: str) -> Indemnity:
-        indem_keywords = ['indemnif', 'hold harmless']
-        exists = any(keyword in text.lower() for keyword in indem_keywords)
+    def _extract_indemnity(self, text: str, text_lower: str) -> Indemnity:
+        window = _clause_window(text, text_lower, _INDEMNITY_KEYWORDS)
+        exists = window is not None
 
         summary = None
         if exists:
-            match = re.search(r'indemni(?:ty|fication|fy)[:\s]+([^\n]{20,150})', text, re.IGNORECASE)
+            match = _INDEMNITY_RE.search(window)
             if match:
                 summary = match.group(1).strip()
 
         return Indemnity(exists=exists, summary=summary)
 
     def _extract_liability_cap(self, text: str) -> Optional[LiabilityCap]:
-        cap_patterns = [
-            r'liability.*?(?:limited|capped|not exceed)\s+.*?\$?([\d,]+)',
-            r'\$?([\d,]+).*?(?:maximum|limit).*?liability',
-        ]
-
-        for pattern in cap_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in _LIABILITY_CAP_RES:
+            match = pattern.search(text)
             if match:
                 amount_str = match.group(1).replace(',', '')
                 try:
@@ -193,42 +234,31 @@ class FieldExtractor:
 
     def _extract_signatories(self, text: str) -> List[Signatory]:
         signatories = []
+        tail = text[-2000:]
 
-        sig_pattern = r'(?:By:|Signature:)\s*([A-Z][a-z]+\s+[A-Z][a-z]+)\s*(?:Title:)?\s*([A-Z][a-z\s]+)?'
-        matches = re.finditer(sig_pattern, text[-2000:])
-
-        for match in matches:
+        for match in islice(_SIG_RE.finditer(tail), 5):
             name = match.group(1).strip() if match.group(1) else ""
             title = match.group(2).strip() if match.group(2) else ""
             signatories.append(Signatory(name=name, title=title))
 
-        return signatories[:5]
+        return signatories
 
-    def _enhance_with_llm(self, result: ExtractResponse, full_text: str) -> ExtractResponse:
-        try:
-            prompt = f"""Extract structured information from this contract text. Return only the requested fields, use null if not found.
+    def _enhance_with_llm(self, result: ExtractResponse, head: str) -> ExtractResponse:
+        missing = tuple(field for field in _LLM_FIELDS if not getattr(result, field))
+        if not missing:
+            return result
 
-Contract text (first 3000 chars):
-{full_text[:3000]}
-
-Extract:
-1. Parties (list of company names)
-2. Effective date (YYYY-MM-DD format)
-3. Term (e.g., "12 months")
-4. Governing law (state/country)
-5. Payment terms (brief description)
-
-Return as JSON with keys: parties, effective_date, term, governing_law, payment_terms"""
-
-            response = self.openai_client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=500
-            )
+        try:
+            cache_key = (hashlib.sha256(head.encode("utf-8")).hexdigest(), missing)
 
-            import json
-            llm_data = json.loads(response.choices[0].message.content)
+            llm_data = self._llm_cache.get(cache_key)
+            if llm_data is None:
+                llm_data = self._request_llm_fields(head, missing)
+                self._llm_cache[cache_key] = llm_data
+                if len(self._llm_cache) > _LLM_CACHE_SIZE:
+                    self._llm_cache.popitem(last=False)
+            else:
+                self._llm_cache.move_to_end(cache_key)
 
             if llm_data.get("parties") and len(llm_data["parties"]) > len(result.parties):
                 result.parties = llm_data["parties"]
@@ -245,3 +275,25 @@ Return as JSON with keys: parties, effective_date, term, governing_law, payment_
             print(f"LLM enhancement failed: {e}")
 
         return result
+
+    def _request_llm_fields(self, head: str, fields: Tuple[str, ...]) -> Dict[str, Any]:
+        field_list = "\n".join(f"{i}. {_LLM_FIELDS[field]}" for i, field in enumerate(fields, 1))
+
+        prompt = f"""Extract structured information from this contract text. Return only the requested fields, use null if not found.
+
+Contract text (first 3000 chars):
+{head}
+
+Extract:
+{field_list}
+
+Return as JSON with keys: {", ".join(fields)}"""
+
+        response = self.openai_client.chat.completions.create(
+            model="gpt-3.5-turbo",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.1,
+            max_tokens=100 * len(fields)
+        )
+
+        return json.loads(response.choices[0].message.content)
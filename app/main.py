@@ -1,136 +1,191 @@
 from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.responses import JSONResponse
-from typing import List
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from typing import List, NamedTuple
+import asyncio
+import orjson
+import tempfile
 import uuid
 from datetime import datetime
 
 from app.models import (
     IngestResponse, ExtractRequest, ExtractResponse, AskRequest, AskResponse,
-    AuditRequest, AuditResponse, HealthResponse, MetricsResponse, DocumentMetadata
+    AskBatchRequest, AskBatchResponse, AuditRequest, AuditResponse, HealthResponse, MetricsResponse, DocumentMetadata
 )
-from app.database import get_supabase_client, increment_metric, get_metrics
+from app.database import get_supabase_client, increment_metric, get_metrics, bulk_insert_pages, bulk_insert_chunks, delete_documents
 from app.pdf_extractor import PDFExtractor
 from app.embeddings import embedding_service
 from app.extractor import FieldExtractor
 from app.auditor import ContractAuditor
 from app.rag import RAGService
+from app.config import settings
 
 app = FastAPI(
     title="Contract Intelligence API",
     description="A production-ready REST API for contract analysis, extraction, and risk assessment",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
-pdf_extractor = PDFExtractor()
+pdf_extractor = PDFExtractor(cache_dir=settings.pdf_cache_dir, cache_max_entries=settings.pdf_cache_max_entries)
 field_extractor = FieldExtractor()
 auditor = ContractAuditor()
 rag_service = RAGService()
 
+UPLOAD_READ_SIZE = 1 << 20
 
-@app.post("/ingest", response_model=IngestResponse, tags=["Document Management"])
-async def ingest_documents(files: List[UploadFile] = File(...)):
-    if not files:
-        raise HTTPException(status_code=400, detail="No files provided")
 
-    supabase = get_supabase_client()
-    documents = []
+async def _spool_upload(file: UploadFile, destination) -> int:
+    file_size = 0
+    while chunk := await file.read(UPLOAD_READ_SIZE):
+        destination.write(chunk)
+        file_size += len(chunk)
+    destination.flush()
+    return file_size
 
-    for file in files:
-        if not file.filename.lower().endswith('.pdf'):
-            raise HTTPException(status_code=400, detail=f"File {file.filename} is not a PDF")
 
-        pdf_bytes = await file.read()
+def _extract_and_chunk(pdf_path: str):
+    full_text, pages_data, page_count = pdf_extractor.extract_text_from_pdf(pdf_path)
+    chunks = pdf_extractor.chunk_text(full_text, pages_data)
+    return full_text, pages_data, page_count, chunks
+
+
+def _answer_events(tokens, sources: List[dict]):
+    yield b"event: sources\ndata: " + orjson.dumps(sources) + b"\n\n"
+    for token in tokens:
+        yield b"data: " + orjson.dumps(token) + b"\n\n"
+    yield b"event: done\ndata: {}\n\n"
+
+
+def _fetch_document(supabase, document_id: str, extraction_columns: str):
+    result = supabase.table("documents").select(
+        f"*, document_pages(*), extractions({extraction_columns})"
+    ).eq("id", document_id).maybeSingle().execute()
+
+    if not result.data:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    document = result.data
+    pages_data = sorted(document.pop("document_pages", None) or [], key=lambda page: page["page_number"])
+
+    extraction = document.pop("extractions", None)
+    if isinstance(extraction, list):
+        extraction = extraction[0] if extraction else None
+
+    return document, pages_data, extraction
+
+
+class _PreparedDocument(NamedTuple):
+    metadata: DocumentMetadata
+    document: dict
+    pages: List[dict]
+    chunks: List[dict]
+
+
+async def _prepare_one(file: UploadFile) -> _PreparedDocument:
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        file_size = await _spool_upload(file, pdf_file)
 
         try:
-            full_text, pages_data, page_count = pdf_extractor.extract_text_from_pdf(pdf_bytes)
+            full_text, pages_data, page_count, chunks = await asyncio.to_thread(_extract_and_chunk, pdf_file.name)
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Failed to extract text from {file.filename}: {str(e)}")
 
-        document_id = str(uuid.uuid4())
+    document_id = str(uuid.uuid4())
+
+    doc_data = {
+        "id": document_id,
+        "filename": file.filename,
+        "mime_type": file.content_type or "application/pdf",
+        "file_size": file_size,
+        "page_count": page_count,
+        "full_text": full_text,
+        "upload_time": datetime.utcnow().isoformat()
+    }
 
-        doc_data = {
-            "id": document_id,
-            "filename": file.filename,
-            "mime_type": file.content_type or "application/pdf",
-            "file_size": len(pdf_bytes),
-            "page_count": page_count,
-            "full_text": full_text,
-            "upload_time": datetime.utcnow().isoformat()
+    page_records = [
+        {
+            "document_id": document_id,
+            "page_number": page_data["page_number"],
+            "text": page_data["text"],
+            "char_start": page_data["char_start"],
+            "char_end": page_data["char_end"]
         }
+        for page_data in pages_data
+    ]
+
+    chunk_texts = [chunk.text for chunk in chunks]
+    embeddings = await asyncio.to_thread(embedding_service.embed_batch, chunk_texts)
+
+    chunk_records = [
+        {
+            "document_id": document_id,
+            "chunk_text": chunk.text,
+            "page_number": chunk.page_number,
+            "char_start": chunk.char_start,
+            "char_end": chunk.char_end,
+            "embedding": embedding
+        }
+        for chunk, embedding in zip(chunks, embeddings)
+    ]
 
-        supabase.table("documents").insert(doc_data).execute()
-
-        for page_data in pages_data:
-            page_record = {
-                "document_id": document_id,
-                "page_number": page_data["page_number"],
-                "text": page_data["text"],
-                "char_start": page_data["char_start"],
-                "char_end": page_data["char_end"]
-            }
-            supabase.table("document_pages").insert(page_record).execute()
-
-        chunks = pdf_extractor.chunk_text(full_text, pages_data)
-
-        chunk_texts = [chunk["chunk_text"] for chunk in chunks]
-        embeddings = embedding_service.embed_batch(chunk_texts)
-
-        for chunk, embedding in zip(chunks, embeddings):
-            chunk_record = {
-                "document_id": document_id,
-                "chunk_text": chunk["chunk_text"],
-                "page_number": chunk["page_number"],
-                "char_start": chunk["char_start"],
-                "char_end": chunk["char_end"],
-                "embedding": embedding
-            }
-            supabase.table("document_chunks").insert(chunk_record).execute()
-
-        documents.append(DocumentMetadata(
-            document_id=document_id,
-            filename=file.filename,
-            pages=page_count
-        ))
+    metadata = DocumentMetadata(document_id=document_id, filename=file.filename, pages=page_count)
+    return _PreparedDocument(metadata, doc_data, page_records, chunk_records)
 
-    await increment_metric("documents_ingested")
 
-    return IngestResponse(documents=documents)
+def _store_one(supabase, prepared: _PreparedDocument):
+    supabase.table("documents").insert(prepared.document).execute()
+    bulk_insert_pages(prepared.pages)
+    bulk_insert_chunks(prepared.chunks)
 
 
-@app.post("/extract", response_model=ExtractResponse, tags=["Analysis"])
-async def extract_fields(request: ExtractRequest):
+@app.post("/ingest", response_model=IngestResponse, tags=["Document Management"])
+async def ingest_documents(files: List[UploadFile] = File(...)):
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+
+    for file in files:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail=f"File {file.filename} is not a PDF")
+
+    try:
+        async with asyncio.TaskGroup() as group:
+            tasks = [group.create_task(_prepare_one(file)) for file in files]
+    except ExceptionGroup as errors:
+        raise errors.exceptions[0]
+
+    prepared = [task.result() for task in tasks]
     supabase = get_supabase_client()
 
-    doc_result = supabase.table("documents").select("*").eq("id", request.document_id).maybeSingle().execute()
+    try:
+        results = await asyncio.gather(
+            *[asyncio.to_thread(_store_one, supabase, document) for document in prepared],
+            return_exceptions=True
+        )
+        failures = [result for result in results if isinstance(result, BaseException)]
+        if failures:
+            await asyncio.to_thread(delete_documents, [document.metadata.document_id for document in prepared])
+            raise HTTPException(status_code=500, detail=f"Failed to store documents: {str(failures[0])}")
+    finally:
+        rag_service.clear_cache()
 
-    if not doc_result.data:
-        raise HTTPException(status_code=404, detail="Document not found")
+    await increment_metric("documents_ingested")
 
-    pages_result = supabase.table("document_pages").select("*").eq("document_id", request.document_id).order("page_number").execute()
+    return IngestResponse(documents=[document.metadata for document in prepared])
 
-    full_text = doc_result.data["full_text"]
-    pages_data = pages_result.data
 
-    extraction = field_extractor.extract_fields(request.document_id, full_text, pages_data)
+@app.post("/extract", response_model=ExtractResponse, tags=["Analysis"])
+async def extract_fields(request: ExtractRequest):
+    supabase = get_supabase_client()
 
-    extraction_record = {
-        "document_id": request.document_id,
-        "parties": extraction.parties,
-        "effective_date": extraction.effective_date,
-        "term": extraction.term,
-        "governing_law": extraction.governing_law,
-        "payment_terms": extraction.payment_terms,
-        "termination": extraction.termination,
-        "auto_renewal": extraction.auto_renewal.dict(),
-        "confidentiality": extraction.confidentiality.dict(),
-        "indemnity": extraction.indemnity.dict(),
-        "liability_cap": extraction.liability_cap.dict() if extraction.liability_cap else None,
-        "signatories": [s.dict() for s in extraction.signatories]
-    }
+    document, pages_data, existing = _fetch_document(supabase, request.document_id, "id")
+    full_text = document["full_text"]
+
+    extraction = field_extractor.extract_fields(request.document_id, full_text, pages_data)
 
-    existing = supabase.table("extractions").select("id").eq("document_id", request.document_id).maybeSingle().execute()
+    extraction_record = extraction.model_dump(mode="json", exclude={"document_id"})
+    extraction_record["document_id"] = request.document_id
 
-    if existing.data:
+    if existing:
         supabase.table("extractions").update(extraction_record).eq("document_id", request.document_id).execute()
     else:
         supabase.table("extractions").insert(extraction_record).execute()
@@ -146,47 +201,54 @@ async def ask_question(request: AskRequest):
         raise HTTPException(status_code=400, detail="Question cannot be empty")
 
     try:
-        answer, sources = rag_service.answer_question(request.question, request.document_ids)
+        answer, sources = rag_service.answer_question(request.question, request.document_ids, stream=request.stream)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to answer question: {str(e)}")
 
     await increment_metric("queries_answered")
 
+    if request.stream:
+        return StreamingResponse(_answer_events(answer, sources), media_type="text/event-stream")
+
     return AskResponse(answer=answer, sources=sources)
 
 
-@app.post("/audit", response_model=AuditResponse, tags=["Analysis"])
-async def audit_contract(request: AuditRequest):
-    supabase = get_supabase_client()
+@app.post("/ask/batch", response_model=AskBatchResponse, tags=["Analysis"])
+async def ask_questions(request: AskBatchRequest):
+    if not request.questions or any(not question or not question.strip() for question in request.questions):
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
 
-    doc_result = supabase.table("documents").select("*").eq("id", request.document_id).maybeSingle().execute()
+    try:
+        results = await asyncio.to_thread(rag_service.answer_questions, request.questions, request.document_ids)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to answer questions: {str(e)}")
 
-    if not doc_result.data:
-        raise HTTPException(status_code=404, detail="Document not found")
+    await increment_metric("queries_answered", len(results))
 
-    extraction_result = supabase.table("extractions").select("*").eq("document_id", request.document_id).maybeSingle().execute()
+    return AskBatchResponse(answers=[AskResponse(answer=answer, sources=sources) for answer, sources in results])
 
-    extraction_data = extraction_result.data if extraction_result.data else {}
 
-    pages_result = supabase.table("document_pages").select("*").eq("document_id", request.document_id).order("page_number").execute()
+@app.post("/audit", response_model=AuditResponse, tags=["Analysis"])
+async def audit_contract(request: AuditRequest):
+    supabase = get_supabase_client()
 
-    full_text = doc_result.data["full_text"]
-    pages_data = pages_result.data
+    document, pages_data, extraction_data = _fetch_document(supabase, request.document_id, "*")
+    full_text = document["full_text"]
+    extraction_data = extraction_data or {}
 
     findings = auditor.audit_contract(request.document_id, full_text, extraction_data, pages_data)
 
-    supabase.table("audit_findings").delete().eq("document_id", request.document_id).execute()
-
-    for finding in findings:
-        finding_record = {
-            "document_id": request.document_id,
+    finding_records = [
+        {
             "finding_id": finding.id,
             "severity": finding.severity.value,
             "type": finding.type,
             "summary": finding.summary,
             "evidence": finding.evidence
         }
-        supabase.table("audit_findings").insert(finding_record).execute()
+        for finding in findings
+    ]
+    supabase.rpc("replace_audit_findings", {"doc_id": request.document_id, "findings": finding_records}).execute()
 
     await increment_metric("audits_run")
 
@@ -69,6 +69,7 @@ class ExtractResponse(BaseModel):
 class AskRequest(BaseModel):
     question: str
     document_ids: Optional[List[str]] = None
+    stream: bool = False
 
 
 class AskResponse(BaseModel):
@@ -76,6 +77,15 @@ class AskResponse(BaseModel):
     sources: List[EvidenceSpan] = []
 
 
+class AskBatchRequest(BaseModel):
+    questions: List[str]
+    document_ids: Optional[List[str]] = None
+
+
+class AskBatchResponse(BaseModel):
+    answers: List[AskResponse]
+
+
 class SeverityEnum(str, Enum):
     HIGH = "HIGH"
     MEDIUM = "MEDIUM"
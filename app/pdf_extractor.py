@@ -1,63 +1,225 @@
 import fitz
-from typing import List, Dict, Tuple
-import io
+import hashlib
+import multiprocessing
+import os
+import threading
+import orjson
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import accumulate, count
+from typing import List, Dict, NamedTuple, Optional, Tuple, Union, BinaryIO
+
+PARALLEL_MIN_PAGES = 8
+PDF_WORKERS = min(os.cpu_count() or 1, 4)
+PDF_CACHE_MAX_ENTRIES = 256
+TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+
+PDFSource = Union[bytes, memoryview, str, os.PathLike, BinaryIO]
+
+
+class Chunk(NamedTuple):
+    text: str
+    page_number: int
+    char_start: int
+    char_end: int
+
+
+def _resolve_source(pdf_source: PDFSource) -> Union[bytes, str]:
+    if isinstance(pdf_source, (str, os.PathLike)):
+        return os.fspath(pdf_source)
+    if isinstance(pdf_source, bytes):
+        return pdf_source
+    if isinstance(pdf_source, (memoryview, bytearray)):
+        return bytes(pdf_source)
+
+    name = getattr(pdf_source, "name", None)
+    if isinstance(name, str) and os.path.isfile(name):
+        pdf_source.flush()
+        return name
+
+    pdf_source.seek(0)
+    return pdf_source.read()
+
+
+def _content_key(pdf_source: Union[bytes, str]) -> str:
+    if isinstance(pdf_source, str):
+        with open(pdf_source, "rb") as pdf_file:
+            return hashlib.file_digest(pdf_file, lambda: hashlib.blake2b(digest_size=16)).hexdigest()
+    return hashlib.blake2b(pdf_source, digest_size=16).hexdigest()
+
+
+def _open_document(pdf_source: Union[bytes, str]):
+    if isinstance(pdf_source, str):
+        return fitz.open(pdf_source, filetype="pdf")
+    return fitz.open(stream=pdf_source, filetype="pdf")
+
+
+def _extract_page_range(pdf_source: Union[bytes, str], start: int, end: int) -> List[str]:
+    doc = _open_document(pdf_source)
+    try:
+        return [doc[page_num].get_text("text", flags=TEXT_FLAGS) for page_num in range(start, end)]
+    finally:
+        doc.close()
 
 
 class PDFExtractor:
-    def extract_text_from_pdf(self, pdf_bytes: bytes) -> Tuple[str, List[Dict[str, any]], int]:
-        doc = fitz.open(stream=pdf_bytes, filetype="pdf")
-
-        full_text = ""
-        pages_data = []
-        char_offset = 0
-
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            page_text = page.get_text()
-
-            char_start = char_offset
-            char_end = char_offset + len(page_text)
-
-            pages_data.append({
-                "page_number": page_num + 1,
+    def __init__(self, cache_dir: Optional[str] = None, cache_max_entries: int = PDF_CACHE_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.cache_max_entries = cache_max_entries
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def _load_cached(self, key: str) -> Optional[Tuple[str, List[Dict[str, any]], int]]:
+        path = self._cache_path(key)
+        try:
+            with open(path, "rb") as cache_file:
+                cached = orjson.loads(cache_file.read())
+            os.utime(path)
+            return cached["full_text"], cached["pages_data"], cached["page_count"]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Ignoring unreadable extraction cache entry {key}: {e}")
+            return None
+
+    def _store_cached(self, key: str, result: Tuple[str, List[Dict[str, any]], int]):
+        full_text, pages_data, page_count = result
+        path = self._cache_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp_path, "wb") as cache_file:
+                cache_file.write(orjson.dumps({
+                    "full_text": full_text,
+                    "pages_data": pages_data,
+                    "page_count": page_count
+                }))
+            os.replace(tmp_path, path)
+            self._evict_cached()
+        except OSError as e:
+            print(f"Failed to write extraction cache entry {key}: {e}")
+
+    def _evict_cached(self):
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.name.endswith(".json"):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except FileNotFoundError:
+                        pass
+
+        if len(entries) <= self.cache_max_entries:
+            return
+
+        entries.sort()
+        for _, path in entries[:len(entries) - self.cache_max_entries]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=PDF_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        with self._pool_lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _extract_pages_parallel(self, pdf_source: Union[bytes, str], n_pages: int) -> List[str]:
+        step = -(-n_pages // PDF_WORKERS)
+        ranges = [(start, min(start + step, n_pages)) for start in range(0, n_pages, step)]
+
+        pool = self._get_pool()
+        try:
+            futures = [pool.submit(_extract_page_range, pdf_source, start, end) for start, end in ranges]
+            return [page_text for future in futures for page_text in future.result()]
+        except BrokenProcessPool as e:
+            print(f"PDF worker pool failed: {e}. Extracting serially.")
+            self._discard_pool(pool)
+            return _extract_page_range(pdf_source, 0, n_pages)
+
+    def extract_text_from_pdf(self, pdf_source: PDFSource) -> Tuple[str, List[Dict[str, any]], int]:
+        pdf_source = _resolve_source(pdf_source)
+        if self.cache_dir is None:
+            return self._extract(pdf_source)
+
+        key = _content_key(pdf_source)
+        cached = self._load_cached(key)
+        if cached is not None:
+            return cached
+
+        result = self._extract(pdf_source)
+        self._store_cached(key, result)
+        return result
+
+    def _extract(self, pdf_source: Union[bytes, str]) -> Tuple[str, List[Dict[str, any]], int]:
+        doc = _open_document(pdf_source)
+        n_pages = len(doc)
+
+        if n_pages >= PARALLEL_MIN_PAGES and PDF_WORKERS > 1:
+            doc.close()
+            page_texts = self._extract_pages_parallel(pdf_source, n_pages)
+        else:
+            page_texts = [doc[page_num].get_text("text", flags=TEXT_FLAGS) for page_num in range(n_pages)]
+            doc.close()
+
+        offsets = list(accumulate(map(len, page_texts), initial=0))
+        pages_data = [
+            {
+                "page_number": page_number,
                 "text": page_text,
                 "char_start": char_start,
                 "char_end": char_end
-            })
-
-            full_text += page_text
-            char_offset = char_end
-
-        doc.close()
-
-        return full_text, pages_data, len(doc)
-
-    def chunk_text(self, text: str, pages_data: List[Dict], chunk_size: int = 1000, overlap: int = 200) -> List[Dict]:
+            }
+            for page_number, page_text, char_start, char_end in zip(count(1), page_texts, offsets, offsets[1:])
+        ]
+
+        return "".join(page_texts), pages_data, n_pages
+
+    def _next_chunk_start(self, page_text: str, start: int, end: int, overlap: int) -> int:
+        window_start = max(end - overlap, start + 1)
+        boundary = max(
+            page_text.rfind(". ", window_start, end) + 2,
+            page_text.rfind("\n", window_start, end) + 1
+        )
+        if boundary > window_start:
+            return boundary
+        return end - overlap
+
+    def chunk_text(self, text: str, pages_data: List[Dict], chunk_size: int = 1000, overlap: int = 200) -> List[Chunk]:
         chunks = []
-        chunk_id = 0
+        previous_chunk = None
 
         for page_data in pages_data:
             page_text = page_data["text"]
             page_number = page_data["page_number"]
             page_char_start = page_data["char_start"]
+            page_len = len(page_text)
 
             start = 0
-            while start < len(page_text):
-                end = min(start + chunk_size, len(page_text))
-
-                chunk_text = page_text[start:end]
+            while start < page_len:
+                end = min(start + chunk_size, page_len)
+                chunk = page_text[start:end]
 
-                if chunk_text.strip():
-                    chunks.append({
-                        "chunk_text": chunk_text,
-                        "page_number": page_number,
-                        "char_start": page_char_start + start,
-                        "char_end": page_char_start + end
-                    })
+                if not chunk.isspace() and chunk != previous_chunk:
+                    chunks.append(Chunk(chunk, page_number, page_char_start + start, page_char_start + end))
+                    previous_chunk = chunk
 
-                if end >= len(page_text):
+                if end >= page_len:
                     break
 
-                start = end - overlap
+                start = self._next_chunk_start(page_text, start, end, overlap)
 
         return chunks
@@ -1,22 +1,146 @@
-from typing import List, Optional, Dict, Any
+import io
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Union, Generator
+import numpy as np
 from app.database import get_supabase_client
 from app.embeddings import embedding_service
 from app.config import settings
 
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+QUESTION_CACHE_SIZE = 2048
+SEMANTIC_CACHE_SIZE = 10000
+SEMANTIC_CACHE_MAX_DISTANCE = 0.05
+SEMANTIC_CACHE_NEIGHBOURS = 5
+
+CONTEXT_MAX_CHARS = 3000
+CONTEXT_TEMPLATE = "[Document {document_id}, Page {page_number}]:\n{chunk_text}"
+NO_ANSWER = "I cannot answer this question as no relevant information was found in the uploaded documents."
+
+_WORD_RE = re.compile(r"\w+")
+_QUESTION_STOPWORDS = frozenset({'what', 'when', 'where', 'who', 'how', 'is', 'are', 'the', 'a', 'an'})
+
+
+class SemanticCache:
+    def __init__(self, dim: int, max_elements: int = SEMANTIC_CACHE_SIZE):
+        self.dim = dim
+        self.max_elements = max_elements
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._index = hnswlib.Index(space='cosine', dim=self.dim)
+        self._index.init_index(max_elements=self.max_elements, ef_construction=100, M=16)
+        self._entries: List[Tuple[Optional[Tuple[str, ...]], str, List[Dict[str, Any]]]] = []
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def lookup(self, embedding: List[float], document_ids: Optional[List[str]]) -> Optional[Tuple[str, List[Dict[str, Any]]]]:
+        scope = tuple(sorted(document_ids)) if document_ids else None
+
+        with self._lock:
+            if not self._entries:
+                return None
+
+            k = min(SEMANTIC_CACHE_NEIGHBOURS, len(self._entries))
+            labels, distances = self._index.knn_query(np.asarray([embedding], dtype=np.float32), k=k)
+
+            for label, distance in zip(labels[0], distances[0]):
+                if distance >= SEMANTIC_CACHE_MAX_DISTANCE:
+                    break
+                entry_scope, answer, sources = self._entries[label]
+                if entry_scope == scope:
+                    return answer, sources
+
+        return None
+
+    def add(self, embedding: List[float], document_ids: Optional[List[str]], answer: str, sources: List[Dict[str, Any]]):
+        scope = tuple(sorted(document_ids)) if document_ids else None
+
+        with self._lock:
+            if len(self._entries) >= self.max_elements:
+                self._reset()
+            self._index.add_items(np.asarray([embedding], dtype=np.float32), [len(self._entries)])
+            self._entries.append((scope, answer, sources))
+
 
 class RAGService:
     def __init__(self):
         self.use_openai = bool(settings.openai_api_key)
-        if self.use_openai:
-            try:
-                import openai
-                self.openai_client = openai.OpenAI(api_key=settings.openai_api_key)
-            except Exception:
-                self.use_openai = False
+        self.semantic_cache = SemanticCache(settings.embedding_dim) if hnswlib is not None else None
+        self._openai_client = None
+        self._question_embeddings: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        self._question_embeddings_lock = threading.Lock()
 
-    def answer_question(self, question: str, document_ids: Optional[List[str]] = None, top_k: int = 5) -> tuple[str, List[Dict[str, Any]]]:
-        question_embedding = embedding_service.embed_text(question)
+    def _get_openai_client(self):
+        if self._openai_client is None:
+            import openai
+            self._openai_client = openai.OpenAI(api_key=settings.openai_api_key)
+        return self._openai_client
 
+    def _cached_question_embedding(self, key: str) -> Optional[List[float]]:
+        with self._question_embeddings_lock:
+            embedding = self._question_embeddings.get(key)
+            if embedding is None:
+                return None
+            self._question_embeddings.move_to_end(key)
+            return list(embedding)
+
+    def _cache_question_embedding(self, key: str, embedding: List[float]):
+        with self._question_embeddings_lock:
+            self._question_embeddings[key] = tuple(embedding)
+            self._question_embeddings.move_to_end(key)
+            if len(self._question_embeddings) > QUESTION_CACHE_SIZE:
+                self._question_embeddings.popitem(last=False)
+
+    def _embed_question(self, question: str) -> Tuple[List[float], bool]:
+        key = question.strip().lower()
+        embedding = self._cached_question_embedding(key)
+        if embedding is not None:
+            return embedding, False
+
+        embedding, fell_back = embedding_service.embed_text_with_fallback(key)
+        if not fell_back:
+            self._cache_question_embedding(key, embedding)
+        return embedding, fell_back
+
+    def _semantic_cache_for(self, fell_back: bool) -> Optional[SemanticCache]:
+        return None if fell_back else self.semantic_cache
+
+    def answer_question(self, question: str, document_ids: Optional[List[str]] = None, top_k: int = 5, stream: bool = False) -> tuple[Union[str, Iterator[str]], List[Dict[str, Any]]]:
+        question_embedding, fell_back = self._embed_question(question)
+        if stream:
+            return self._stream_with_embedding(question, question_embedding, document_ids, top_k, fell_back)
+        return self._answer_with_embedding(question, question_embedding, document_ids, top_k, fell_back)
+
+    def answer_questions(self, questions: List[str], document_ids: Optional[List[str]] = None, top_k: int = 5) -> List[tuple[str, List[Dict[str, Any]]]]:
+        keys = list(dict.fromkeys(question.strip().lower() for question in questions))
+        embeddings = {key: self._cached_question_embedding(key) for key in keys}
+
+        missing = [key for key, embedding in embeddings.items() if embedding is None]
+        fell_back = False
+        if missing:
+            missing_embeddings, fell_back = embedding_service.embed_batch_with_fallback(missing)
+            for key, embedding in zip(missing, missing_embeddings):
+                embeddings[key] = embedding
+                if not fell_back:
+                    self._cache_question_embedding(key, embedding)
+        fallback_keys = frozenset(missing) if fell_back else frozenset()
+
+        answers = []
+        for question in questions:
+            key = question.strip().lower()
+            answers.append(self._answer_with_embedding(question, embeddings[key], document_ids, top_k, key in fallback_keys))
+        return answers
+
+    def _retrieve_chunks(self, question: str, question_embedding: List[float], document_ids: Optional[List[str]], top_k: int) -> List[Dict[str, Any]]:
         supabase = get_supabase_client()
 
         if document_ids:
@@ -37,56 +161,121 @@ class RAGService:
                 }
             ).execute()
 
-        if not result.data:
-            relevant_chunks = []
-            query = supabase.table("document_chunks").select("*")
-            if document_ids:
-                query = query.in_("document_id", document_ids)
-            all_chunks = query.limit(top_k).execute()
-            relevant_chunks = all_chunks.data if all_chunks.data else []
-        else:
-            relevant_chunks = result.data
-
+        relevant_chunks = result.data or []
         if not relevant_chunks:
-            return "I cannot answer this question as no relevant information was found in the uploaded documents.", []
-
-        context_text = "\n\n".join([
-            f"[Document {chunk['document_id']}, Page {chunk['page_number']}]:\n{chunk['chunk_text']}"
-            for chunk in relevant_chunks
-        ])
+            print(f"Vector search returned no chunks for question {question!r} (document_ids={document_ids})")
+        return relevant_chunks
 
-        if self.use_openai:
-            answer = self._generate_answer_with_llm(question, context_text)
-        else:
-            answer = self._generate_answer_fallback(question, context_text)
+    def _build_context(self, relevant_chunks: List[Dict[str, Any]], max_chars: Optional[int] = None) -> str:
+        buffer = io.StringIO()
+        for index, chunk in enumerate(relevant_chunks):
+            if index:
+                buffer.write("\n\n")
+            buffer.write(CONTEXT_TEMPLATE.format_map(chunk))
+            if max_chars is not None and buffer.tell() >= max_chars:
+                break
+        return buffer.getvalue()
 
-        sources = []
-        for chunk in relevant_chunks:
-            sources.append({
+    def _build_sources(self, relevant_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {
                 "document_id": chunk["document_id"],
                 "page": chunk["page_number"],
                 "char_start": chunk["char_start"],
                 "char_end": chunk["char_end"],
                 "excerpt": chunk["chunk_text"][:200]
-            })
+            }
+            for chunk in relevant_chunks
+        ]
+
+    def _answer_with_embedding(self, question: str, question_embedding: List[float], document_ids: Optional[List[str]], top_k: int, fell_back: bool = False) -> tuple[str, List[Dict[str, Any]]]:
+        semantic_cache = self._semantic_cache_for(fell_back)
+        if semantic_cache is not None:
+            cached = semantic_cache.lookup(question_embedding, document_ids)
+            if cached is not None:
+                return cached
+
+        relevant_chunks = self._retrieve_chunks(question, question_embedding, document_ids, top_k)
+        if not relevant_chunks:
+            return NO_ANSWER, []
+
+        cacheable = True
+        if self.use_openai:
+            answer = self._generate_answer_with_llm(question, self._build_context(relevant_chunks, CONTEXT_MAX_CHARS))
+            if answer is None:
+                answer = self._generate_answer_fallback(question, self._build_context(relevant_chunks))
+                cacheable = False
+        else:
+            answer = self._generate_answer_fallback(question, self._build_context(relevant_chunks))
+
+        sources = self._build_sources(relevant_chunks)
+
+        if cacheable and semantic_cache is not None:
+            semantic_cache.add(question_embedding, document_ids, answer, sources)
 
         return answer, sources
 
-    def _generate_answer_with_llm(self, question: str, context: str) -> str:
-        try:
-            prompt = f"""Answer the following question based ONLY on the provided context. Do not use external knowledge.
+    def _stream_with_embedding(self, question: str, question_embedding: List[float], document_ids: Optional[List[str]], top_k: int, fell_back: bool = False) -> tuple[Iterator[str], List[Dict[str, Any]]]:
+        semantic_cache = self._semantic_cache_for(fell_back)
+        if semantic_cache is not None:
+            cached = semantic_cache.lookup(question_embedding, document_ids)
+            if cached is not None:
+                answer, sources = cached
+                return iter([answer]), sources
+
+        relevant_chunks = self._retrieve_chunks(question, question_embedding, document_ids, top_k)
+        if not relevant_chunks:
+            return iter([NO_ANSWER]), []
+
+        sources = self._build_sources(relevant_chunks)
+
+        if self.use_openai:
+            tokens = self._stream_answer_with_llm(question, relevant_chunks)
+        else:
+            tokens = self._yield_answer(self._generate_answer_fallback(question, self._build_context(relevant_chunks)))
+
+        if semantic_cache is None:
+            return tokens, sources
+        return self._cache_streamed_answer(tokens, semantic_cache, question_embedding, document_ids, sources), sources
+
+    def _yield_answer(self, answer: str) -> Generator[str, None, bool]:
+        yield answer
+        return True
+
+    def _cache_streamed_answer(self, tokens: Generator[str, None, bool], semantic_cache: SemanticCache, question_embedding: List[float], document_ids: Optional[List[str]], sources: List[Dict[str, Any]]) -> Iterator[str]:
+        parts = []
+        while True:
+            try:
+                token = next(tokens)
+            except StopIteration as stop:
+                complete = stop.value
+                break
+            parts.append(token)
+            yield token
+
+        if complete:
+            semantic_cache.add(question_embedding, document_ids, "".join(parts).strip(), sources)
+
+    def clear_cache(self):
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
+
+    def _build_prompt(self, question: str, context: str) -> str:
+        return f"""Answer the following question based ONLY on the provided context. Do not use external knowledge.
 If the answer cannot be found in the context, say "I cannot answer this question based on the provided documents."
 
 Context:
-{context[:3000]}
+{context[:CONTEXT_MAX_CHARS]}
 
 Question: {question}
 
 Answer:"""
 
-            response = self.openai_client.chat.completions.create(
+    def _generate_answer_with_llm(self, question: str, context: str) -> Optional[str]:
+        try:
+            response = self._get_openai_client().chat.completions.create(
                 model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
+                messages=[{"role": "user", "content": self._build_prompt(question, context)}],
                 temperature=0.1,
                 max_tokens=300
             )
@@ -95,20 +284,43 @@ Answer:"""
 
         except Exception as e:
             print(f"LLM answer generation failed: {e}")
-            return self._generate_answer_fallback(question, context)
+            return None
 
-    def _generate_answer_fallback(self, question: str, context: str) -> str:
-        question_lower = question.lower()
+    def _stream_answer_with_llm(self, question: str, relevant_chunks: List[Dict[str, Any]]) -> Generator[str, None, bool]:
+        streamed = False
+        try:
+            response = self._get_openai_client().chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": self._build_prompt(question, self._build_context(relevant_chunks, CONTEXT_MAX_CHARS))}],
+                temperature=0.1,
+                max_tokens=300,
+                stream=True
+            )
 
-        context_sentences = context.split('.')
-        relevant_sentences = []
+            for chunk in response:
+                if not chunk.choices:
+                    continue
+                content = chunk.choices[0].delta.content
+                if content:
+                    streamed = True
+                    yield content
 
-        question_keywords = set(question_lower.split()) - {'what', 'when', 'where', 'who', 'how', 'is', 'are', 'the', 'a', 'an'}
+            return True
+
+        except Exception as e:
+            print(f"LLM answer streaming failed: {e}")
+            if not streamed:
+                yield self._generate_answer_fallback(question, self._build_context(relevant_chunks))
+            return False
+
+    def _generate_answer_fallback(self, question: str, context: str) -> str:
+        question_keywords = frozenset(_WORD_RE.findall(question.lower())) - _QUESTION_STOPWORDS
 
-        for sentence in context_sentences:
-            sentence_lower = sentence.lower()
-            if any(keyword in sentence_lower for keyword in question_keywords):
-                relevant_sentences.append(sentence.strip())
+        relevant_sentences = [
+            sentence.strip()
+            for sentence in context.split('.')
+            if question_keywords & set(_WORD_RE.findall(sentence.lower()))
+        ]
 
         if relevant_sentences:
             return '. '.join(relevant_sentences[:3]) + '.'
@@ -1,33 +1,39 @@
-import json
+import asyncio
 import sys
 import os
-import requests
-from typing import List, Dict, Any
+import httpx
+import orjson
+from functools import lru_cache
+from typing import List, Dict, Any, FrozenSet
 
 API_BASE_URL = os.getenv("API_BASE_URL", "http://localhost:8000")
+MAX_CONCURRENT_REQUESTS = 8
 
 
 def load_eval_set(filepath: str = "eval/qa_eval_set.json") -> List[Dict[str, Any]]:
-    with open(filepath, 'r') as f:
-        return json.load(f)
+    with open(filepath, 'rb') as f:
+        return orjson.loads(f.read())
+
+
+@lru_cache(maxsize=256)
+def _tokens(text: str) -> FrozenSet[str]:
+    return frozenset(text.lower().split())
 
 
 def calculate_f1(expected: str, actual: str) -> float:
-    expected_tokens = set(expected.lower().split())
-    actual_tokens = set(actual.lower().split())
+    expected_tokens = _tokens(expected)
+    actual_tokens = _tokens(actual)
 
     if not expected_tokens or not actual_tokens:
         return 0.0
 
     true_positives = len(expected_tokens & actual_tokens)
-    false_positives = len(actual_tokens - expected_tokens)
-    false_negatives = len(expected_tokens - actual_tokens)
 
     if true_positives == 0:
         return 0.0
 
-    precision = true_positives / (true_positives + false_positives)
-    recall = true_positives / (true_positives + false_negatives)
+    precision = true_positives / len(actual_tokens)
+    recall = true_positives / len(expected_tokens)
 
     f1 = 2 * (precision * recall) / (precision + recall)
     return f1
@@ -37,7 +43,16 @@ def exact_match(expected: str, actual: str) -> bool:
     return expected.lower().strip() == actual.lower().strip()
 
 
-def run_evaluation(document_ids: List[str] = None) -> Dict[str, Any]:
+async def _ask(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, question: str, document_ids: List[str] = None) -> httpx.Response:
+    async with semaphore:
+        return await client.post(
+            f"{API_BASE_URL}/ask",
+            content=orjson.dumps({"question": question, "document_ids": document_ids}),
+            headers={"Content-Type": "application/json"}
+        )
+
+
+async def run_evaluation(document_ids: List[str] = None) -> Dict[str, Any]:
     eval_set = load_eval_set()
 
     total_questions = len(eval_set)
@@ -49,20 +64,25 @@ def run_evaluation(document_ids: List[str] = None) -> Dict[str, Any]:
     print(f"API Base URL: {API_BASE_URL}")
     print("-" * 80)
 
-    for item in eval_set:
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    limits = httpx.Limits(max_connections=MAX_CONCURRENT_REQUESTS, max_keepalive_connections=MAX_CONCURRENT_REQUESTS)
+    async with httpx.AsyncClient(timeout=30, limits=limits) as client:
+        responses = await asyncio.gather(
+            *[_ask(client, semaphore, item["question"], document_ids) for item in eval_set],
+            return_exceptions=True
+        )
+
+    for item, response in zip(eval_set, responses):
         question_id = item["id"]
         question = item["question"]
         expected = item["expected_answer"]
 
         try:
-            response = requests.post(
-                f"{API_BASE_URL}/ask",
-                json={"question": question, "document_ids": document_ids},
-                timeout=30
-            )
+            if isinstance(response, Exception):
+                raise response
 
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 actual_answer = data.get("answer", "")
                 sources = data.get("sources", [])
 
@@ -138,7 +158,7 @@ def save_score(results: Dict[str, Any], filepath: str = "eval/score.txt"):
 if __name__ == "__main__":
     doc_ids = sys.argv[1:] if len(sys.argv) > 1 else None
 
-    results = run_evaluation(document_ids=doc_ids)
+    results = asyncio.run(run_evaluation(document_ids=doc_ids))
     save_score(results)
 
     print(f"\nFinal Score: {results['average_f1'] * 100:.1f}/100")
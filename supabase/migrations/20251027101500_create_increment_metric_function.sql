@@ -0,0 +1,23 @@
+/*
+  # Metric Counter Function
+
+  Creates an atomic counter function used by the API to record usage metrics.
+
+  ## Functions
+
+  ### `increment_metric`
+  Increments a metric counter, creating the row if it does not exist yet
+  - Parameters:
+    - `name` (text) - the metric identifier
+  - Uses a single `INSERT ... ON CONFLICT` so concurrent requests never lose increments
+*/
+
+CREATE OR REPLACE FUNCTION increment_metric(name text)
+RETURNS void
+LANGUAGE sql
+AS $$
+  INSERT INTO metrics (metric_name, metric_value, updated_at)
+  VALUES (name, 1, now())
+  ON CONFLICT (metric_name)
+  DO UPDATE SET metric_value = metrics.metric_value + 1, updated_at = now();
+$$;
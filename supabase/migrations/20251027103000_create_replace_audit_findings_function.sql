@@ -0,0 +1,37 @@
+/*
+  # Audit Findings Replacement Function
+
+  Creates a function that swaps the stored audit findings for a document in one call.
+
+  ## Functions
+
+  ### `replace_audit_findings`
+  Deletes the existing findings for a document and inserts the new set
+  - Parameters:
+    - `doc_id` (uuid) - the audited document
+    - `findings` (jsonb) - array of {finding_id, severity, type, summary, evidence}
+  - Runs as a single statement batch inside one transaction, so readers never
+    see a partially replaced set of findings
+*/
+
+CREATE OR REPLACE FUNCTION replace_audit_findings(
+  doc_id uuid,
+  findings jsonb
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  DELETE FROM audit_findings WHERE audit_findings.document_id = doc_id;
+
+  INSERT INTO audit_findings (document_id, finding_id, severity, type, summary, evidence)
+  SELECT
+    doc_id,
+    finding->>'finding_id',
+    finding->>'severity',
+    finding->>'type',
+    finding->>'summary',
+    COALESCE(finding->'evidence', '[]'::jsonb)
+  FROM jsonb_array_elements(findings) AS finding;
+END;
+$$;
@@ -0,0 +1,21 @@
+/*
+  # HNSW Index for Chunk Embeddings
+
+  Replaces the IVFFlat index on chunk embeddings with an HNSW index.
+
+  ## Indexes
+
+  ### `document_chunks_embedding_idx`
+  Approximate nearest-neighbour index used by `match_document_chunks` and `match_document_chunks_all`
+  - Method: `hnsw` with `vector_cosine_ops`, matching the `<=>` ordering in both functions
+  - Parameters: `m = 16`, `ef_construction = 64`
+  - Unlike IVFFlat, HNSW needs no training data, so recall does not degrade when the
+    index is created on an empty table and rows arrive afterwards
+*/
+
+DROP INDEX IF EXISTS document_chunks_embedding_idx;
+
+CREATE INDEX IF NOT EXISTS document_chunks_embedding_idx
+  ON document_chunks
+  USING hnsw (embedding vector_cosine_ops)
+  WITH (m = 16, ef_construction = 64);
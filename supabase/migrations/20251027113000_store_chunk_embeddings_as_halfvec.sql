@@ -0,0 +1,102 @@
+/*
+  # Half-Precision Chunk Embeddings
+
+  Stores chunk embeddings as 16-bit floats to halve their storage and index size.
+  Requires pgvector 0.7.0 or later.
+
+  ## Tables
+
+  ### `document_chunks`
+  - `embedding` (halfvec(384)) - converted in place from vector(384)
+
+  ## Indexes
+
+  ### `document_chunks_embedding_idx`
+  Rebuilt as HNSW over `halfvec_cosine_ops` (m = 16, ef_construction = 64)
+
+  ## Functions
+
+  ### `match_document_chunks` / `match_document_chunks_all`
+  Recreated with a `halfvec(384)` query embedding so the `<=>` ordering runs on
+  half-precision values and can use the rebuilt index. Parameters and returned
+  columns are unchanged.
+*/
+
+DROP INDEX IF EXISTS document_chunks_embedding_idx;
+
+ALTER TABLE document_chunks
+  ALTER COLUMN embedding TYPE halfvec(384) USING embedding::halfvec(384);
+
+CREATE INDEX IF NOT EXISTS document_chunks_embedding_idx
+  ON document_chunks
+  USING hnsw (embedding halfvec_cosine_ops)
+  WITH (m = 16, ef_construction = 64);
+
+DROP FUNCTION IF EXISTS match_document_chunks(vector, int, uuid[]);
+DROP FUNCTION IF EXISTS match_document_chunks_all(vector, int);
+
+-- Function to match chunks with document ID filter
+CREATE OR REPLACE FUNCTION match_document_chunks(
+  query_embedding halfvec(384),
+  match_count int DEFAULT 5,
+  filter_doc_ids uuid[] DEFAULT NULL
+)
+RETURNS TABLE (
+  id uuid,
+  document_id uuid,
+  chunk_text text,
+  page_number int,
+  char_start int,
+  char_end int,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    document_chunks.id,
+    document_chunks.document_id,
+    document_chunks.chunk_text,
+    document_chunks.page_number,
+    document_chunks.char_start,
+    document_chunks.char_end,
+    1 - (document_chunks.embedding <=> query_embedding) as similarity
+  FROM document_chunks
+  WHERE filter_doc_ids IS NULL OR document_chunks.document_id = ANY(filter_doc_ids)
+  ORDER BY document_chunks.embedding <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
+
+-- Function to match chunks across all documents
+CREATE OR REPLACE FUNCTION match_document_chunks_all(
+  query_embedding halfvec(384),
+  match_count int DEFAULT 5
+)
+RETURNS TABLE (
+  id uuid,
+  document_id uuid,
+  chunk_text text,
+  page_number int,
+  char_start int,
+  char_end int,
+  similarity float
+)
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  RETURN QUERY
+  SELECT
+    document_chunks.id,
+    document_chunks.document_id,
+    document_chunks.chunk_text,
+    document_chunks.page_number,
+    document_chunks.char_start,
+    document_chunks.char_end,
+    1 - (document_chunks.embedding <=> query_embedding) as similarity
+  FROM document_chunks
+  ORDER BY document_chunks.embedding <=> query_embedding
+  LIMIT match_count;
+END;
+$$;
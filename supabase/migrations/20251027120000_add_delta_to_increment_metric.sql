@@ -0,0 +1,26 @@
+/*
+  # Metric Counter Increment Amount
+
+  Lets a single call add more than one to a metric counter.
+
+  ## Functions
+
+  ### `increment_metric`
+  Replaces the single-argument version
+  - Parameters:
+    - `name` (text) - the metric identifier
+    - `delta` (int, default 1) - how much to add
+  - Still a single `INSERT ... ON CONFLICT`, so concurrent requests never lose increments
+*/
+
+DROP FUNCTION IF EXISTS increment_metric(text);
+
+CREATE OR REPLACE FUNCTION increment_metric(name text, delta int DEFAULT 1)
+RETURNS void
+LANGUAGE sql
+AS $$
+  INSERT INTO metrics (metric_name, metric_value, updated_at)
+  VALUES (name, delta, now())
+  ON CONFLICT (metric_name)
+  DO UPDATE SET metric_value = metrics.metric_value + delta, updated_at = now();
+$$;
@@ -0,0 +1,17 @@
+/*
+  # Document Delete Policy
+
+  Lets the API roll back documents from an ingest request that failed part-way.
+
+  ## Security
+
+  ### `documents`
+  - Adds a public DELETE policy, matching the existing public read/insert policies
+  - Pages, chunks, extractions and audit findings are removed by their
+    `ON DELETE CASCADE` foreign keys
+*/
+
+CREATE POLICY "Allow public delete access to documents"
+  ON documents FOR DELETE
+  TO public
+  USING (true);
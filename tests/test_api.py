@@ -38,6 +38,28 @@ def test_ingest_no_files():
     assert response.status_code == 422
 
 
+def test_ingest_stores_nothing_when_any_pdf_fails(monkeypatch):
+    import fitz
+    import app.main
+
+    doc = fitz.open()
+    doc.new_page().insert_text((72, 72), "Services agreement.")
+    valid_pdf = doc.tobytes()
+    doc.close()
+
+    stored = []
+    monkeypatch.setattr(app.main, "_store_one", lambda supabase, prepared: stored.append(prepared))
+
+    response = client.post("/ingest", files=[
+        ("files", ("valid.pdf", valid_pdf, "application/pdf")),
+        ("files", ("broken.pdf", b"not a pdf", "application/pdf")),
+    ])
+
+    assert response.status_code == 500
+    assert "broken.pdf" in response.json()["detail"]
+    assert stored == []
+
+
 def test_extract_invalid_document():
     response = client.post("/extract", json={"document_id": "00000000-0000-0000-0000-000000000000"})
     assert response.status_code == 404
@@ -56,6 +78,14 @@ def test_ask_valid_question():
     assert "sources" in data
 
 
+def test_ask_stream_sends_sources_first():
+    response = client.post("/ask", json={"question": "What is the effective date?", "stream": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("event: sources\n")
+    assert response.text.rstrip().endswith("event: done\ndata: {}")
+
+
 def test_audit_invalid_document():
     response = client.post("/audit", json={"document_id": "00000000-0000-0000-0000-000000000000"})
     assert response.status_code == 404
@@ -68,3 +98,17 @@ def test_openapi_docs():
     assert "openapi" in schema
     assert "info" in schema
     assert "paths" in schema
+
+
+def test_ask_batch_empty_question():
+    response = client.post("/ask/batch", json={"questions": ["What is the term?", " "]})
+    assert response.status_code == 400
+
+
+def test_ask_batch_preserves_order():
+    questions = ["What is the effective date?", "Which law governs the agreement?"]
+    response = client.post("/ask/batch", json={"questions": questions})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["answers"]) == len(questions)
+    assert all("answer" in item and "sources" in item for item in data["answers"])
@@ -1,4 +1,5 @@
 import pytest
+import app.auditor as auditor_module
 from app.auditor import ContractAuditor
 from app.models import SeverityEnum
 
@@ -87,3 +88,85 @@ def test_no_findings_for_good_contract(auditor, sample_pages):
 
     high_findings = [f for f in findings if f.severity == SeverityEnum.HIGH]
     assert len(high_findings) == 0
+
+
+def test_evidence_page_lookup(auditor):
+    text = "Services are described below.\n" + "Party shall have unlimited liability for all claims."
+    pages = [
+        {"page_number": 1, "text": text[:30], "char_start": 0, "char_end": 30},
+        {"page_number": 2, "text": text[30:], "char_start": 30, "char_end": len(text)}
+    ]
+
+    findings = auditor.audit_contract("doc-1", text, {}, pages)
+
+    liability_findings = [f for f in findings if f.type == "unlimited_liability"]
+    assert liability_findings[0].evidence[0]["page"] == 2
+
+
+def test_finding_ids_are_unique(auditor, sample_pages):
+    text = "Party shall have unlimited liability. This agreement may only be terminated for cause."
+    extraction = {"auto_renewal": {"exists": True, "notice_period_days": 15}}
+
+    findings = auditor.audit_contract("doc-1", text, extraction, sample_pages)
+
+    assert len(findings) >= 3
+    assert [f.id for f in findings] == [f"FIND-{i:03d}" for i in range(1, len(findings) + 1)]
+
+
+RISK_SCAN_TEXTS = [
+    "Party shall have unlimited liability for all claims.",
+    "Party shall have unlimited\xa0liability for all claims.",
+    "Either\u2003party\u2009may\u202fterminate this agreement.",
+    "Liability is capped\nwithout\u3000limit on damages.",
+    "The Customer shall INDEMNIFY the Provider against any and all losses.",
+    "Termination for\u2028convenience requires notice.",
+    "Services are provided as described.",
+]
+
+
+def _stdlib_risk_scan(text):
+    return {
+        pattern_id for pattern_id, patterns in auditor_module._RISK_PATTERNS
+        if any(pattern.search(text) for pattern in patterns)
+    }
+
+
+@pytest.mark.parametrize("backend", ["hyperscan", "re2", "re"])
+def test_risk_scan_backends_agree(backend, monkeypatch):
+    if backend == "hyperscan":
+        if auditor_module._RISK_DATABASE is None:
+            pytest.skip("hyperscan is not installed")
+    else:
+        monkeypatch.setattr(auditor_module, "_RISK_DATABASE", None)
+        risk_set = auditor_module._build_risk_set() if backend == "re2" else None
+        if backend == "re2" and risk_set is None:
+            pytest.skip("re2 is not installed")
+        monkeypatch.setattr(auditor_module, "_RISK_SET", risk_set)
+
+    for text in RISK_SCAN_TEXTS:
+        assert auditor_module._scan_risk_patterns(text) == _stdlib_risk_scan(text)
+
+
+EVIDENCE_SCAN_TEXTS = [
+    "Party shall have unlimited liability for all claims.",
+    "liability " * 40,
+    "Short line.\nThe liability of the Supplier is limited.\nLiability\nfor loss is excluded.",
+    ("x" * 150) + "Liability" + ("y" * 30) + "LIABILITY" + ("z" * 250) + "liability",
+    "No matching keyword at all.",
+]
+
+
+def test_fast_evidence_scan_matches_regex(auditor, monkeypatch):
+    if auditor_module._scan_keyword is None:
+        monkeypatch.setattr(auditor_module, "_scan_keyword", auditor_module._scan_keyword_spans)
+    monkeypatch.setattr(auditor_module, "FAST_SCAN_MIN_CHARS", 0)
+    pattern = auditor_module._compile_evidence_pattern("liability")
+
+    for text in EVIDENCE_SCAN_TEXTS:
+        pages = [{"page_number": 1, "text": text, "char_start": 0, "char_end": len(text)}]
+        full_text_lower = auditor_module._fast_scan_text(text)
+        assert full_text_lower == text.lower()
+        evidence = auditor._find_evidence(text, full_text_lower, auditor_module._build_page_index(pages), ("liability",))
+
+        expected = [match.span() for match in pattern.finditer(text)][:2]
+        assert [(item["char_start"], item["char_end"]) for item in evidence] == expected
@@ -0,0 +1,102 @@
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+import numpy as np
+import app.embeddings
+from app.embeddings import EmbeddingService
+
+
+class StubModel:
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(texts)
+        return np.full((len(texts), 2), -1.0)
+
+
+def _embedding_service(create):
+    service = EmbeddingService.__new__(EmbeddingService)
+    service.use_openai = True
+    service.model = StubModel()
+    service._model_lock = threading.Lock()
+    service.openai_client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    service._openai_pool = ThreadPoolExecutor(max_workers=4)
+    return service
+
+
+def _response(texts):
+    return SimpleNamespace(data=[SimpleNamespace(embedding=[float(text), 0.0]) for text in texts])
+
+
+@pytest.fixture(autouse=True)
+def small_shards(monkeypatch):
+    monkeypatch.setattr(app.embeddings, "OPENAI_BATCH_SIZE", 2)
+
+
+def test_batch_is_sharded_in_order():
+    shards = []
+
+    def create(input, **kwargs):
+        shards.append(input)
+        return _response(input)
+
+    service = _embedding_service(create)
+    embeddings, fell_back = service.embed_batch_with_fallback(["1", "2", "3", "4", "5"])
+
+    assert embeddings == [[1.0, 0.0], [2.0, 0.0], [3.0, 0.0], [4.0, 0.0], [5.0, 0.0]]
+    assert not fell_back
+    assert sorted(shards) == [["1", "2"], ["3", "4"], ["5"]]
+    assert service.model.calls == []
+
+
+def test_failed_shard_is_retried_with_primary_model():
+    failed = []
+
+    def create(input, **kwargs):
+        if input == ["3", "4"] and not failed:
+            failed.append(input)
+            raise RuntimeError("rate limited")
+        return _response(input)
+
+    service = _embedding_service(create)
+    embeddings, fell_back = service.embed_batch_with_fallback(["1", "2", "3", "4", "5"])
+
+    assert [embedding[0] for embedding in embeddings] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert not fell_back
+    assert service.model.calls == []
+
+
+def test_persistent_shard_failure_falls_back_for_whole_batch():
+    def create(input, **kwargs):
+        if input == ["3", "4"]:
+            raise RuntimeError("service unavailable")
+        return _response(input)
+
+    service = _embedding_service(create)
+    embeddings, fell_back = service.embed_batch_with_fallback(["1", "2", "3", "4", "5"])
+
+    assert embeddings == [[-1.0, -1.0]] * 5
+    assert fell_back
+    assert service.model.calls == [["1", "2", "3", "4", "5"]]
+
+
+def test_fallback_model_loads_once_across_threads(monkeypatch):
+    loads = []
+
+    def load_model(name):
+        loads.append(name)
+        time.sleep(0.05)
+        return StubModel()
+
+    monkeypatch.setattr("sentence_transformers.SentenceTransformer", load_model)
+    service = _embedding_service(None)
+    service.model = None
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        models = list(pool.map(lambda _: service._get_model(), range(4)))
+
+    assert loads == ["all-MiniLM-L6-v2"]
+    assert all(model is models[0] for model in models)
@@ -1,5 +1,9 @@
+import json
 import pytest
+from types import SimpleNamespace
+import app.extractor
 from app.extractor import FieldExtractor
+from app.models import ExtractResponse
 
 
 @pytest.fixture
@@ -58,6 +62,18 @@ def test_extract_effective_date(extractor, sample_contract):
     assert "2024" in result.effective_date
 
 
+def test_effective_date_falls_back_to_later_formats(extractor):
+    text = "Effective Date: Jan 15, 2024. Invoices are payable from 01/15/2024 onward."
+    assert extractor._extract_effective_date(text) == "2024-01-15"
+
+
+def test_parties_from_overlapping_patterns(extractor):
+    text = "Party A: Acme Holdings Inc\nThis is between Gamma Corp and Delta Inc."
+    parties = extractor._extract_parties(text)
+    assert "Gamma Corp" in parties
+    assert any(party.startswith("Acme Holdings Inc") for party in parties)
+
+
 def test_extract_term(extractor, sample_contract):
     result = extractor.extract_fields("test-doc-1", sample_contract, [])
     assert result.term is not None
@@ -96,3 +112,72 @@ def test_extract_liability_cap(extractor, sample_contract):
     result = extractor.extract_fields("test-doc-1", sample_contract, [])
     assert result.liability_cap is not None
     assert result.liability_cap.amount == 100000.0
+
+
+def test_parse_date_formats(extractor):
+    assert extractor._parse_date("January 15, 2024") == "2024-01-15"
+    assert extractor._parse_date("January 15 2024") == "2024-01-15"
+    assert extractor._parse_date("01/15/2024") == "2024-01-15"
+    assert extractor._parse_date("2024-01-15") == "2024-01-15"
+    assert extractor._parse_date("15 January 2024") == "2024-01-15"
+    assert extractor._parse_date("15-01-2024") == "2024-01-15"
+    assert extractor._parse_date("13/45/2024") is None
+
+
+def test_auto_renewal_notice_taken_from_renewal_clause(extractor):
+    text = (
+        "Termination requires 90 days notice.\n"
+        + "Standard terms apply. " * 200
+        + "\nThis Agreement will automatically renew unless 60 days prior notice is given."
+    )
+    result = extractor.extract_fields("test-doc-2", text, [])
+    assert result.auto_renewal.exists is True
+    assert result.auto_renewal.notice_period_days == 60
+
+
+class StubCompletions:
+    def __init__(self, content):
+        self.content = content
+        self.calls = []
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(self.content)))])
+
+
+def _use_llm(extractor, content):
+    completions = StubCompletions(content)
+    extractor.use_openai = True
+    extractor.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return completions
+
+
+def test_llm_requests_only_missing_fields_and_caches_by_head(extractor):
+    completions = _use_llm(extractor, {"governing_law": "Delaware", "payment_terms": "Net 30"})
+    head = "This Agreement is governed by the laws of Delaware."
+
+    def partial_result():
+        return ExtractResponse(document_id="doc-1", parties=["Acme Corporation", "Beta Services LLC"], effective_date="2024-01-15", term="12 months")
+
+    first = extractor._enhance_with_llm(partial_result(), head)
+    second = extractor._enhance_with_llm(partial_result(), head)
+
+    assert len(completions.calls) == 1
+    prompt = completions.calls[0]["messages"][0]["content"]
+    assert "Return as JSON with keys: governing_law, payment_terms" in prompt
+    assert "Effective date" not in prompt and "Parties" not in prompt
+    assert completions.calls[0]["max_tokens"] == 200
+    assert first.governing_law == second.governing_law == "Delaware"
+    assert second.payment_terms == "Net 30"
+
+
+def test_llm_cache_evicts_least_recently_used(extractor, monkeypatch):
+    completions = _use_llm(extractor, {"term": "12 months"})
+    monkeypatch.setattr(app.extractor, "_LLM_CACHE_SIZE", 2)
+
+    heads = ["Contract A", "Contract B", "Contract A", "Contract C", "Contract A", "Contract B"]
+    for head in heads:
+        extractor._enhance_with_llm(ExtractResponse(document_id="doc-1"), head)
+
+    requested = [head for call in completions.calls for head in sorted(set(heads)) if f"\n{head}\n" in call["messages"][0]["content"]]
+    assert requested == ["Contract A", "Contract B", "Contract C", "Contract B"]
@@ -0,0 +1,161 @@
+import io
+import os
+import pytest
+import fitz
+from app.pdf_extractor import PDFExtractor
+
+
+@pytest.fixture
+def pdf_extractor():
+    return PDFExtractor()
+
+
+@pytest.fixture
+def sample_pdf():
+    doc = fitz.open()
+    for page_num in range(3):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Page {page_num + 1} of the services agreement.")
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+def test_extract_text_from_pdf(pdf_extractor, sample_pdf):
+    full_text, pages_data, page_count = pdf_extractor.extract_text_from_pdf(sample_pdf)
+
+    assert page_count == 3
+    assert len(pages_data) == 3
+    assert "Page 2 of the services agreement." in full_text
+
+
+def test_page_offsets_cover_full_text(pdf_extractor, sample_pdf):
+    full_text, pages_data, _ = pdf_extractor.extract_text_from_pdf(sample_pdf)
+
+    assert pages_data[0]["char_start"] == 0
+    assert pages_data[-1]["char_end"] == len(full_text)
+    for page_data in pages_data:
+        assert full_text[page_data["char_start"]:page_data["char_end"]] == page_data["text"]
+
+
+def test_extract_accepts_path_buffer_and_file(pdf_extractor, sample_pdf, tmp_path):
+    pdf_path = tmp_path / "contract.pdf"
+    pdf_path.write_bytes(sample_pdf)
+    expected = pdf_extractor.extract_text_from_pdf(sample_pdf)
+
+    assert pdf_extractor.extract_text_from_pdf(pdf_path) == expected
+    assert pdf_extractor.extract_text_from_pdf(str(pdf_path)) == expected
+    assert pdf_extractor.extract_text_from_pdf(memoryview(sample_pdf)) == expected
+    assert pdf_extractor.extract_text_from_pdf(io.BytesIO(sample_pdf)) == expected
+    with open(pdf_path, "rb") as pdf_file:
+        assert pdf_extractor.extract_text_from_pdf(pdf_file) == expected
+
+
+def test_extraction_cache_reuses_result(sample_pdf, tmp_path, monkeypatch):
+    cached_extractor = PDFExtractor(cache_dir=str(tmp_path / "cache"))
+    first = cached_extractor.extract_text_from_pdf(sample_pdf)
+
+    def fail_extract(pdf_source):
+        raise AssertionError("cache miss")
+
+    monkeypatch.setattr(cached_extractor, "_extract", fail_extract)
+    assert cached_extractor.extract_text_from_pdf(memoryview(sample_pdf)) == first
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_extraction_cache_evicts_oldest_entries(tmp_path):
+    cache_dir = tmp_path / "cache"
+    cached_extractor = PDFExtractor(cache_dir=str(cache_dir), cache_max_entries=2)
+
+    for page_count in range(1, 4):
+        doc = fitz.open()
+        for _ in range(page_count):
+            doc.new_page()
+        pdf_bytes = doc.tobytes()
+        doc.close()
+        cached_extractor.extract_text_from_pdf(pdf_bytes)
+
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_parallel_extraction_matches_sequential(pdf_extractor, monkeypatch):
+    doc = fitz.open()
+    for page_num in range(12):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Clause {page_num + 1}: liability is limited.")
+    pdf_bytes = doc.tobytes()
+    doc.close()
+
+    monkeypatch.setattr("app.pdf_extractor.PDF_WORKERS", 3)
+    parallel = pdf_extractor.extract_text_from_pdf(pdf_bytes)
+
+    monkeypatch.setattr("app.pdf_extractor.PARALLEL_MIN_PAGES", 100)
+    sequential = pdf_extractor.extract_text_from_pdf(pdf_bytes)
+
+    assert parallel == sequential
+    assert parallel[2] == 12
+
+
+def test_parallel_extraction_recovers_from_dead_worker(pdf_extractor, monkeypatch):
+    doc = fitz.open()
+    for page_num in range(12):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Clause {page_num + 1}: liability is limited.")
+    pdf_bytes = doc.tobytes()
+    doc.close()
+
+    monkeypatch.setattr("app.pdf_extractor.PDF_WORKERS", 3)
+    expected = pdf_extractor.extract_text_from_pdf(pdf_bytes)
+
+    broken_pool = pdf_extractor._get_pool()
+    with pytest.raises(Exception):
+        broken_pool.submit(os._exit, 1).result()
+
+    assert pdf_extractor.extract_text_from_pdf(pdf_bytes) == expected
+    assert pdf_extractor._pool is None
+    assert pdf_extractor.extract_text_from_pdf(pdf_bytes) == expected
+    assert pdf_extractor._pool is not broken_pool
+    pdf_extractor._pool.shutdown()
+
+
+def test_chunk_text_windows(pdf_extractor):
+    page_text = "".join(chr(ord("a") + i % 26) for i in range(2500))
+    pages_data = [{"page_number": 1, "text": page_text, "char_start": 0, "char_end": 2500}]
+
+    chunks = pdf_extractor.chunk_text(page_text, pages_data, chunk_size=1000, overlap=200)
+
+    assert [(c.char_start, c.char_end) for c in chunks] == [(0, 1000), (800, 1800), (1600, 2500)]
+
+
+def test_chunk_text_skips_blank_windows(pdf_extractor):
+    pages_data = [
+        {"page_number": 1, "text": "   \n  ", "char_start": 0, "char_end": 6},
+        {"page_number": 2, "text": "Payment terms apply.", "char_start": 6, "char_end": 26}
+    ]
+
+    chunks = pdf_extractor.chunk_text("", pages_data)
+
+    assert len(chunks) == 1
+    assert chunks[0].page_number == 2
+    assert chunks[0].char_start == 6
+
+
+def test_chunk_overlap_starts_at_sentence_boundary(pdf_extractor):
+    page_text = "a" * 900 + ". " + "b" * 1000
+    pages_data = [{"page_number": 1, "text": page_text, "char_start": 0, "char_end": len(page_text)}]
+
+    chunks = pdf_extractor.chunk_text(page_text, pages_data, chunk_size=1000, overlap=200)
+
+    assert chunks[1].char_start == 902
+    assert chunks[1].text.startswith("b")
+
+
+def test_chunk_skips_repeated_adjacent_windows(pdf_extractor):
+    pages_data = [
+        {"page_number": 1, "text": "CONFIDENTIAL", "char_start": 0, "char_end": 12},
+        {"page_number": 2, "text": "CONFIDENTIAL", "char_start": 12, "char_end": 24}
+    ]
+
+    chunks = pdf_extractor.chunk_text("", pages_data)
+
+    assert len(chunks) == 1
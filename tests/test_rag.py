@@ -0,0 +1,184 @@
+import pytest
+from types import SimpleNamespace
+import app.rag
+from app.rag import RAGService, SemanticCache
+
+pytest.importorskip("hnswlib")
+
+
+CHUNKS = [{
+    "document_id": "doc-1",
+    "page_number": 1,
+    "char_start": 0,
+    "char_end": 40,
+    "chunk_text": "The effective date is January 1, 2024."
+}]
+
+
+def _delta(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+@pytest.fixture
+def rag_service(monkeypatch):
+    service = RAGService()
+    service.semantic_cache = SemanticCache(dim=4)
+    monkeypatch.setattr(service, "_retrieve_chunks", lambda *args: CHUNKS)
+    return service
+
+
+def _use_llm(service, monkeypatch, create):
+    service.use_openai = True
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(service, "_get_openai_client", lambda: client)
+
+
+def test_completed_stream_is_cached(rag_service, monkeypatch):
+    _use_llm(rag_service, monkeypatch, lambda **kwargs: iter([_delta("January "), _delta("1, 2024")]))
+    embedding = [1.0, 0.0, 0.0, 0.0]
+
+    tokens, sources = rag_service._stream_with_embedding("When?", embedding, None, 5)
+
+    assert list(tokens) == ["January ", "1, 2024"]
+    assert rag_service.semantic_cache.lookup(embedding, None) == ("January 1, 2024", sources)
+
+
+def test_interrupted_stream_is_not_cached(rag_service, monkeypatch):
+    def interrupted_stream(**kwargs):
+        yield _delta("January ")
+        raise RuntimeError("connection reset")
+
+    _use_llm(rag_service, monkeypatch, interrupted_stream)
+    embedding = [1.0, 0.0, 0.0, 0.0]
+
+    tokens, _ = rag_service._stream_with_embedding("When?", embedding, None, 5)
+
+    assert list(tokens) == ["January "]
+    assert rag_service.semantic_cache.lookup(embedding, None) is None
+
+
+def test_llm_failure_fallback_is_not_cached(rag_service, monkeypatch):
+    def failing_completion(**kwargs):
+        raise RuntimeError("service unavailable")
+
+    _use_llm(rag_service, monkeypatch, failing_completion)
+    embedding = [1.0, 0.0, 0.0, 0.0]
+
+    answer, _ = rag_service._answer_with_embedding("What is the effective date?", embedding, None, 5)
+
+    assert "January 1, 2024" in answer
+    assert rag_service.semantic_cache.lookup(embedding, None) is None
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_llm_failure_fallback_uses_every_retrieved_chunk(rag_service, monkeypatch, stream):
+    def failing_completion(**kwargs):
+        raise RuntimeError("service unavailable")
+
+    filler = {"document_id": "doc-2", "page_number": 1, "char_start": 0, "char_end": 3500, "chunk_text": "x" * 3500}
+    monkeypatch.setattr(rag_service, "_retrieve_chunks", lambda *args: [filler] + CHUNKS)
+    _use_llm(rag_service, monkeypatch, failing_completion)
+    embedding = [1.0, 0.0, 0.0, 0.0]
+
+    if stream:
+        tokens, _ = rag_service._stream_with_embedding("What is the effective date?", embedding, None, 5)
+        answer = "".join(tokens)
+    else:
+        answer, _ = rag_service._answer_with_embedding("What is the effective date?", embedding, None, 5)
+
+    assert "January 1, 2024" in answer
+
+
+@pytest.mark.parametrize("fell_back, expected_calls", [(False, 1), (True, 2)])
+def test_question_embedding_cache_skips_fallback_vectors(rag_service, monkeypatch, fell_back, expected_calls):
+    calls = []
+
+    def embed(text):
+        calls.append(text)
+        return [1.0, 0.0, 0.0, 0.0], fell_back
+
+    monkeypatch.setattr(app.rag.embedding_service, "embed_text_with_fallback", embed)
+
+    assert rag_service._embed_question("What is the term?") == ([1.0, 0.0, 0.0, 0.0], fell_back)
+    assert rag_service._embed_question("  what is the TERM? ") == ([1.0, 0.0, 0.0, 0.0], fell_back)
+    assert calls == ["what is the term?"] * expected_calls
+
+
+def test_fallback_question_vectors_bypass_semantic_cache(rag_service, monkeypatch):
+    monkeypatch.setattr(app.rag.embedding_service, "embed_text_with_fallback", lambda text: ([1.0, 0.0, 0.0, 0.0], True))
+    rag_service.semantic_cache.add([1.0, 0.0, 0.0, 0.0], None, "cached answer", [])
+
+    answer, sources = rag_service.answer_question("What is the effective date?")
+    tokens, _ = rag_service.answer_question("What is the effective date?", stream=True)
+
+    assert answer != "cached answer"
+    assert sources[0]["document_id"] == "doc-1"
+    assert "".join(tokens) == answer
+
+    rag_service.semantic_cache.clear()
+    rag_service.answer_question("What is the effective date?")
+    list(rag_service.answer_question("What is the effective date?", stream=True)[0])
+    assert rag_service.semantic_cache.lookup([1.0, 0.0, 0.0, 0.0], None) is None
+
+
+def test_semantic_cache_matches_near_duplicates_in_same_scope():
+    cache = SemanticCache(dim=4)
+    cache.add([1.0, 0.0, 0.0, 0.0], ["doc-2", "doc-1"], "answer", [])
+
+    assert cache.lookup([0.99, 0.01, 0.0, 0.0], ["doc-1", "doc-2"]) == ("answer", [])
+    assert cache.lookup([0.99, 0.01, 0.0, 0.0], ["doc-1"]) is None
+    assert cache.lookup([0.99, 0.01, 0.0, 0.0], None) is None
+
+
+def test_semantic_cache_rejects_distant_questions():
+    cache = SemanticCache(dim=4)
+    cache.add([1.0, 0.0, 0.0, 0.0], None, "answer", [])
+
+    assert cache.lookup([0.7, 0.7, 0.0, 0.0], None) is None
+    assert cache.lookup([0.0, 1.0, 0.0, 0.0], None) is None
+
+
+def test_semantic_cache_resets_when_full():
+    cache = SemanticCache(dim=4, max_elements=2)
+    cache.add([1.0, 0.0, 0.0, 0.0], None, "first", [])
+    cache.add([0.0, 1.0, 0.0, 0.0], None, "second", [])
+    cache.add([0.0, 0.0, 1.0, 0.0], None, "third", [])
+
+    assert cache.lookup([1.0, 0.0, 0.0, 0.0], None) is None
+    assert cache.lookup([0.0, 0.0, 1.0, 0.0], None) == ("third", [])
+
+
+def test_semantic_cache_clear():
+    cache = SemanticCache(dim=4)
+    cache.add([1.0, 0.0, 0.0, 0.0], None, "answer", [])
+    cache.clear()
+
+    assert cache.lookup([1.0, 0.0, 0.0, 0.0], None) is None
+
+
+def test_batch_questions_share_the_embedding_cache(rag_service, monkeypatch):
+    batched = []
+
+    def embed_batch(texts):
+        batched.append(texts)
+        return [[1.0, 0.0, 0.0, 0.0] for _ in texts], False
+
+    monkeypatch.setattr(app.rag.embedding_service, "embed_batch_with_fallback", embed_batch)
+    monkeypatch.setattr(rag_service, "_answer_with_embedding", lambda question, embedding, *args: (question, args[-1]))
+    rag_service._cache_question_embedding("what is the term?", [0.0, 1.0, 0.0, 0.0])
+
+    answers = rag_service.answer_questions(["What is the term?", "Who signed?", "who signed?"])
+
+    assert answers == [("What is the term?", False), ("Who signed?", False), ("who signed?", False)]
+    assert batched == [["who signed?"]]
+    assert rag_service._cached_question_embedding("who signed?") == [1.0, 0.0, 0.0, 0.0]
+
+
+def test_batch_fallback_vectors_are_flagged(rag_service, monkeypatch):
+    monkeypatch.setattr(app.rag.embedding_service, "embed_batch_with_fallback", lambda texts: ([[1.0, 0.0, 0.0, 0.0] for _ in texts], True))
+    monkeypatch.setattr(rag_service, "_answer_with_embedding", lambda question, embedding, *args: (question, args[-1]))
+    rag_service._cache_question_embedding("what is the term?", [0.0, 1.0, 0.0, 0.0])
+
+    answers = rag_service.answer_questions(["What is the term?", "Who signed?"])
+
+    assert answers == [("What is the term?", False), ("Who signed?", True)]